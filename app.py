@@ -1,12 +1,24 @@
 import streamlit as st
 import os
-import subprocess
 import shutil
 
 from auth_utils import (
     create_users_table, add_user, authenticate_user, reset_password,
     get_all_users, delete_user_by_id, ensure_violations_table
 )
+from scripts.violation_db import (
+    SORT_COLUMNS, VIOLATION_COLUMNS, distinct_values, query_violations,
+    violation_totals, daily_counts, hourly_counts, video_counts,
+    snapshot_categories, snapshot_dates, count_snapshots, list_snapshots, delete_snapshot_records,
+    record_upload, video_labels
+)
+from scripts import result_cache
+from scripts.engine import DEFAULT_OUTPUT_STRIDE
+from scripts.thumbnails import clear_thumbnails, get_thumbnail
+from scripts.zones import load_cameras
+from scripts.jobs import ACTIVE_STATUSES, eta_seconds, get_job, list_jobs, request_cancel
+from scripts.worker import enqueue_job, submit_stream
+from upload_utils import store_upload
 
 # Ensure required tables exist
 create_users_table()
@@ -84,111 +96,366 @@ def show_dashboard():
 
     uploaded_video = st.file_uploader("📤 Upload a Traffic Video", type=["mp4"])
     if uploaded_video:
-        video_path = os.path.join("input_videos", uploaded_video.name)
-        os.makedirs("input_videos", exist_ok=True)
-        with open(video_path, "wb") as f:
-            f.write(uploaded_video.read())
+        video_path = save_upload(uploaded_video)
 
         st.video(video_path)
         st.markdown("### 🔍 Choose Detection Module")
+        output_mode = st.selectbox("🎞️ Annotated video", list(OUTPUT_LABELS), format_func=OUTPUT_LABELS.get)
+        options = {"output_mode": output_mode}
+        cameras = list(load_cameras())
+        if cameras:
+            # A camera's zones restrict its rules and let inference skip the rest of the frame
+            camera = st.selectbox("📷 Camera zones", [None] + cameras, format_func=lambda c: c or "None (full frame)")
+            if camera:
+                options["camera"] = camera
 
         col1, col2 = st.columns(2)
         col3, col4 = st.columns(2)
 
         if col1.button("🪖 Helmet Detection"):
-            run_detection("helmet", video_path)
+            run_detection("helmet", video_path, **options)
         if col2.button("🚦 Signal Jumping"):
-            run_detection("signal_detection", video_path)
+            run_detection("signal_detection", video_path, **options)
         if col3.button("🛣️ Lane Violation"):
-            run_detection("lane", video_path)
+            run_detection("lane", video_path, **options)
         if col4.button("🧑‍🤝‍🧑 Triple Riding"):
-            run_detection("triple", video_path)
-
-def run_detection(module_name, video_path):
-    st.info(f"🚀 Running {module_name.replace('_', ' ').title()} detection...")
-
-    script_path = os.path.join("scripts", f"{module_name}.py")
-
+            run_detection("triple", video_path, **options)
+        if st.button("🧾 Full Audit (all modules, single pass)"):
+            run_detection("engine", video_path, **options)
+
+    show_jobs()
+    show_open_job()
+
+    with st.expander("📡 Live Camera / Stream"):
+        source = st.text_input("Stream URL or device index", placeholder="rtsp://camera.local/stream or 0")
+        duration = st.number_input("Duration (seconds)", min_value=5, max_value=3600, value=60)
+        if st.button("▶️ Start Live Detection") and source:
+            run_live_detection(source, int(duration))
+
+def save_upload(uploaded_video):
+    """Path of the stored copy of an upload, hashing and writing it once per file."""
+    # Streamlit reruns the script on every interaction; remember what was already stored
+    uploads = st.session_state.setdefault("uploads", {})
+    key = getattr(uploaded_video, "file_id", None) or (uploaded_video.name, uploaded_video.size)
+    video_path = uploads.get(key)
+    if video_path and os.path.exists(video_path):
+        return video_path
+
+    video_path, is_new = store_upload(uploaded_video)
+    if not is_new:
+        st.info(f"♻️ {uploaded_video.name} was uploaded before; reusing the stored copy.")
+    # Stored under its hash; reports show the name it was uploaded as
+    record_upload(video_path, uploaded_video.name)
+    fetch_video_labels.clear()
+    uploads[key] = video_path
+    return video_path
+
+# Detection module -> engine rules it runs (see scripts/engine.py)
+DETECTION_MODULES = {
+    "helmet": ["helmet"],
+    "signal_detection": ["signal"],
+    "lane": ["lane"],
+    "triple": ["triple"],
+    "engine": ["helmet", "signal", "lane", "triple"],
+}
+
+# Annotated video output modes (see OUTPUT_MODES in scripts/engine.py)
+OUTPUT_LABELS = {
+    "full": "Every frame",
+    "every": f"Every {DEFAULT_OUTPUT_STRIDE}th frame",
+    "violations": "Violating frames only",
+    "none": "None (rows and snapshots only, fastest)",
+}
+
+def run_detection(module_name, video_path, **options):
     if not os.path.exists(video_path):
         st.error(f"❌ Input video not found at: {video_path}")
         return
 
-    if not os.path.exists(script_path):
-        st.error(f"❌ Detection script not found: {script_path}")
+    if module_name not in DETECTION_MODULES:
+        st.error(f"❌ Unknown detection module: {module_name}")
         return
 
-    result = subprocess.run(
-        ["python3", script_path, video_path],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode == 0:
-        st.success(f"✅ {module_name.replace('_', ' ').title()} detection complete!")
-
-        output_video_path = f"output/{module_name}_output.mp4"
-        if os.path.exists(output_video_path):
-            st.video(output_video_path)
-
-        snapshot_dir = f"output/{module_name}_violations"
-        if os.path.exists(snapshot_dir):
-            st.markdown("#### 📸 Snapshots of Violations")
-            images = [f for f in os.listdir(snapshot_dir) if f.endswith(".jpg")]
-            for img in images:
-                st.image(os.path.join(snapshot_dir, img), width=400)
-        else:
-            st.warning("⚠️ No snapshots found.")
+    title = module_name.replace('_', ' ').title()
+    rules = DETECTION_MODULES[module_name]
+    try:
+        # Same clip, rules, weights and thresholds as an earlier run: reuse its results
+        cached = result_cache.lookup(result_cache.cache_key(video_path, rules, **options))
+        if cached:
+            show_detection_result(title, rules, {"ok": True, **cached})
+            return
+        job_id = enqueue_job(video_path, rules, submitted_by=st.session_state.user["username"], **options)
+    except Exception as e:
+        show_detection_result(title, rules, {"ok": False, "error": str(e)})
+        return
+    st.info(f"🚀 {title} detection queued as job #{job_id}; follow it under Detection Jobs below.")
+
+def show_detection_result(title, rules, result):
+    if result["ok"]:
+        st.success(f"✅ {title} detection complete!")
+        stats = result["stats"]
+        st.caption(f"Processed {stats['frames']} frames: {stats['inferred']} inferred, "
+                   f"{stats['skipped']} skipped as static."
+                   + (" Served from the result cache." if result.get("cached") else ""))
+        if stats.get("timings") and not result.get("cached"):
+            with st.expander("⏱️ Run timings"):
+                st.caption(f"{stats['fps']} frames/s, inference p50 {stats['inference_ms']['p50']} ms, "
+                           f"p99 {stats['inference_ms']['p99']} ms")
+                st.json(stats["timings"])
+        if result.get("violations"):
+            st.dataframe(result["violations"], hide_index=True)
+        for rule_name in rules:
+            show_detection_outputs(rule_name, result["outputs"][rule_name])
     else:
         st.error("❌ Detection failed with the following error:")
-        st.code(result.stderr or "No error message captured.")
+        st.code(result.get("traceback") or result.get("error") or "No error message captured.")
+
+JOB_REFRESH_SECONDS = 1
+JOB_HISTORY = 10
+
+@st.fragment(run_every=JOB_REFRESH_SECONDS)
+def show_jobs():
+    # Job state lives in the database, so a reloaded page picks running jobs back up
+    jobs = list_jobs(submitted_by=st.session_state.user["username"], limit=JOB_HISTORY)
+    if not jobs:
+        return
+
+    st.markdown("### ⏳ Detection Jobs")
+    for job in jobs:
+        name = ", ".join(job["modules"] or DETECTION_MODULES["engine"])
+        label = f"Job #{job['id']} ({name})"
+        col1, col2 = st.columns([5, 1])
+        if job["status"] in ACTIVE_STATUSES:
+            if job["status"] == "queued":
+                col1.progress(0.0, text=f"{label}: queued")
+            else:
+                total = job["total_frames"]
+                fraction = min(1.0, job["frames_done"] / total) if total else 0.0
+                eta = eta_seconds(job)
+                col1.progress(fraction, text=f"{label}: {job['frames_done']}/{total or '?'} frames, "
+                                             f"{job['fps'] or 0:.1f} FPS, "
+                                             f"ETA {f'{eta:.0f}s' if eta is not None else '?'}"
+                                             + (" (cancelling)" if job["cancel_requested"] else ""))
+            if col2.button("Cancel", key=f"cancel_job_{job['id']}"):
+                request_cancel(job["id"])
+        else:
+            col1.write(f"{label}: {job['status']}")
+            if job["status"] in ("done", "failed") and col2.button("Open", key=f"open_job_{job['id']}"):
+                st.session_state.open_job = job["id"]
+                st.rerun()
+
+def show_open_job():
+    job_id = st.session_state.get("open_job")
+    job = get_job(job_id) if job_id else None
+    if not job:
+        return
+    rules = job["modules"] or DETECTION_MODULES["engine"]
+    if job["status"] == "done":
+        result = {"ok": True, **job["result"]}
+    else:
+        result = {"ok": False, "error": f"Job #{job['id']} {job['status']}", "traceback": job["error"]}
+    show_detection_result(f"Job #{job['id']}", rules, result)
+
+def run_live_detection(source, duration):
+    st.info(f"📡 Running live detection on {source} for {duration}s...")
+    try:
+        result = submit_stream(source, duration=duration)
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+
+    if result["ok"]:
+        stats = result["stats"]
+        st.success("✅ Live detection finished!")
+        st.caption(f"Captured {stats['captured']} frames, processed {stats['frames']}; "
+                   f"dropped {stats['dropped_overwritten'] + stats['dropped_stale']} to keep up.")
+        for rule_name in DETECTION_MODULES["engine"]:
+            show_detection_outputs(rule_name, result["outputs"][rule_name])
+    else:
+        st.error("❌ Live detection failed with the following error:")
+        st.code(result.get("traceback") or result.get("error") or "No error message captured.")
+
+def show_detection_outputs(rule_name, outputs):
+    output_video_path = outputs["output"]
+    if output_video_path and os.path.exists(output_video_path):
+        st.video(output_video_path)
+
+    # The run reports the snapshots it wrote, so there is no directory to scan
+    if outputs["snapshots"]:
+        st.markdown("#### 📸 Snapshots of Violations")
+        for img_path in outputs["snapshots"]:
+            st.image(img_path, width=400)
+    else:
+        st.warning("⚠️ No snapshots found.")
+
+REPORT_PAGE_SIZES = [25, 50, 100, 250]
+REPORT_CACHE_TTL = 30  # seconds; reruns within this window reuse query results
+
+@st.cache_data(ttl=REPORT_CACHE_TTL, show_spinner=False)
+def fetch_violation_page(types, start_date, end_date, video, sort, descending, after, limit):
+    return query_violations(list(types), start_date, end_date, video, sort, descending, after, limit)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_filter_values(column):
+    return distinct_values(column)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_video_labels(videos):
+    return video_labels(videos)
 
 def show_reports():
-    import sqlite3
     import pandas as pd
 
     st.title("📊 Violation Reports")
 
     try:
-        conn = sqlite3.connect("violations.db")
-        df = pd.read_sql_query("SELECT * FROM violations", conn)
-        conn.close()
-
-        if not df.empty:
-            st.dataframe(df)
+        col1, col2, col3 = st.columns(3)
+        types = col1.multiselect("Violation type", fetch_filter_values("type"))
+        dates = col2.date_input("Date range", value=())
+        videos = fetch_filter_values("video")
+        labels = fetch_video_labels(tuple(videos))
+        video = col3.selectbox("Source video", ["All"] + videos, format_func=lambda v: labels.get(v, v))
+
+        col4, col5, col6 = st.columns(3)
+        sort = col4.selectbox("Sort by", SORT_COLUMNS)
+        descending = col5.radio("Order", ["Newest / Z-A first", "Oldest / A-Z first"]) == "Newest / Z-A first"
+        limit = col6.selectbox("Rows per page", REPORT_PAGE_SIZES, index=1)
+
+        start_date = str(dates[0]) if len(dates) > 0 else None
+        end_date = str(dates[1]) if len(dates) > 1 else start_date
+        filters = (tuple(types), start_date, end_date, None if video == "All" else video, sort, descending, limit)
+
+        # Keyset cursors of the pages visited so far; reset whenever the filters change
+        if st.session_state.get("report_filters") != filters:
+            st.session_state.report_filters = filters
+            st.session_state.report_cursors = [None]
+        cursors = st.session_state.report_cursors
+
+        rows, next_cursor = fetch_violation_page(*filters[:6], cursors[-1], limit)
+
+        if rows:
+            page = pd.DataFrame(rows, columns=VIOLATION_COLUMNS)
+            page_labels = fetch_video_labels(tuple(sorted(set(page["video"].dropna()))))
+            page["video"] = page["video"].map(lambda v: page_labels.get(v, v))
+            st.dataframe(page, hide_index=True)
         else:
-            st.info("No violations logged yet.")
+            st.info("No violations logged yet." if len(cursors) == 1 else "No more violations.")
+
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        page_col.caption(f"Page {len(cursors)}")
+        if prev_col.button("⬅️ Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        if next_col.button("Next ➡️", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
     except Exception as e:
         st.error("Failed to load reports.")
         st.code(str(e))
 
+STATS_WINDOWS = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90}
+
+def show_statistics():
+    import pandas as pd
+    from datetime import date, datetime, timedelta
+
+    st.title("📈 Violation Statistics")
+
+    # Every query below reads the rollup tables, never the raw violations table
+    totals = violation_totals()
+    if not totals:
+        st.info("No violations logged yet.")
+        return
+
+    st.metric("Total violations", sum(count for _, count in totals))
+    st.subheader("By type (all time)")
+    st.bar_chart(pd.DataFrame(totals, columns=["type", "count"]).set_index("type"))
+
+    window = st.selectbox("Time window", list(STATS_WINDOWS))
+    since_day = date.today() - timedelta(days=STATS_WINDOWS[window] - 1)
+
+    daily = pd.DataFrame(daily_counts(since_day), columns=["day", "type", "count"])
+    st.subheader("Per day")
+    if daily.empty:
+        st.info("No violations in this window.")
+    else:
+        st.line_chart(daily.pivot(index="day", columns="type", values="count").fillna(0))
+
+    since_hour = (datetime.now() - timedelta(hours=47)).strftime("%Y-%m-%d %H")
+    hourly = pd.DataFrame(hourly_counts(since_hour), columns=["hour", "type", "count"])
+    st.subheader("Per hour (last 48 hours)")
+    if hourly.empty:
+        st.info("No violations in the last 48 hours.")
+    else:
+        st.bar_chart(hourly.pivot(index="hour", columns="type", values="count").fillna(0))
+
+    st.subheader("Top source videos")
+    videos = pd.DataFrame(video_counts(since_day), columns=["video", "count"])
+    labels = fetch_video_labels(tuple(sorted(set(videos["video"].dropna()))))
+    videos["video"] = videos["video"].map(lambda v: labels.get(v, v)).replace("", "(unknown)")
+    st.dataframe(videos, hide_index=True)
+
+GALLERY_PAGE_SIZE = 12
+GALLERY_COLUMNS = 3
+
 def show_snapshots_gallery():
     st.title("🖼️ All Snapshots Gallery")
 
     base_dir = "snapshots"
-    if os.path.exists(base_dir):
-        with st.expander("🧹 Clear All Snapshots"):
-            if st.button("Delete All Snapshots"):
-                shutil.rmtree(base_dir)
-                os.makedirs(base_dir, exist_ok=True)
-                st.success("All snapshots deleted.")
-                st.rerun()
+    with st.expander("🧹 Clear All Snapshots"):
+        if st.button("Delete All Snapshots"):
+            shutil.rmtree(base_dir, ignore_errors=True)
+            os.makedirs(base_dir, exist_ok=True)
+            delete_snapshot_records()
+            clear_thumbnails()
+            st.success("All snapshots deleted.")
+            st.rerun()
 
-        for category in sorted(os.listdir(base_dir)):
-            category_path = os.path.join(base_dir, category)
-            if os.path.isdir(category_path):
-                st.header(category.title())
-                for date in sorted(os.listdir(category_path)):
-                    date_path = os.path.join(category_path, date)
-                    if os.path.isdir(date_path):
-                        st.subheader(f"📅 {date}")
-                        images = [img for img in os.listdir(date_path) if img.endswith(".jpg")]
-                        cols = st.columns(3)
-                        for idx, img in enumerate(images):
-                            img_path = os.path.join(date_path, img)
-                            with cols[idx % 3]:
-                                st.image(img_path, caption=img, use_container_width=True)
-    else:
+    # Categories, dates and pages come from the snapshot manifest, not directory walks
+    categories = snapshot_categories()
+    if not categories:
         st.info("No snapshots available.")
+        return
+
+    col1, col2 = st.columns(2)
+    category = col1.selectbox("Category", categories, format_func=str.title)
+    dates = snapshot_dates(category)
+    if not dates:
+        st.info("No snapshots in this category.")
+        return
+    date = col2.selectbox("📅 Date", dates)
+
+    total = count_snapshots(category, date)
+    pages = max(1, -(-total // GALLERY_PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                           key=f"gallery_page_{category}_{date}")
+    st.caption(f"{total} snapshots")
+
+    # Full-resolution image only for the snapshot the user asked to open
+    selected = st.session_state.get("gallery_full_image")
+    if selected and os.path.exists(selected):
+        st.image(selected, caption=os.path.basename(selected), use_container_width=True)
+        if st.button("Close full image"):
+            st.session_state.gallery_full_image = None
+            st.rerun()
+
+    cols = st.columns(GALLERY_COLUMNS)
+    page_snapshots = list_snapshots(category, date, limit=GALLERY_PAGE_SIZE, offset=(page - 1) * GALLERY_PAGE_SIZE)
+    missing = []
+    for idx, snapshot in enumerate(page_snapshots):
+        img_path = snapshot["path"]
+        with cols[idx % GALLERY_COLUMNS]:
+            if not os.path.exists(img_path):
+                missing.append(img_path)
+                continue
+            thumb = get_thumbnail(img_path)
+            if thumb:
+                st.image(thumb, caption=os.path.basename(img_path), use_container_width=True)
+            if st.button("🔍 View full size", key=f"full_{img_path}"):
+                st.session_state.gallery_full_image = img_path
+                st.rerun()
+    if missing:
+        # Files removed outside the app; drop their stale manifest rows
+        delete_snapshot_records(missing)
 
 import os
 import streamlit as st
@@ -198,6 +465,13 @@ def show_annotated_videos():
 
     video_dir = "output"
     videos = [f for f in os.listdir(video_dir) if f.endswith(".mp4")]
+    # Queued jobs write to output/jobs/<job id>/
+    jobs_dir = os.path.join(video_dir, "jobs")
+    if os.path.isdir(jobs_dir):
+        for job_id in sorted(os.listdir(jobs_dir), key=lambda d: int(d) if d.isdigit() else 0, reverse=True):
+            job_dir = os.path.join(jobs_dir, job_id)
+            if os.path.isdir(job_dir):
+                videos.extend(os.path.join("jobs", job_id, f) for f in os.listdir(job_dir) if f.endswith(".mp4"))
 
     with st.expander("🧹 Clear All Videos"):
         if st.button("Delete All Videos"):
@@ -235,7 +509,7 @@ if "user" not in st.session_state:
 menu_options = ["Login", "Sign Up", "Reset Password"]
 
 if st.session_state.user:
-    menu_options = ["Dashboard", "Reports", "Snapshots", "Annotated Videos", "Logout"]
+    menu_options = ["Dashboard", "Reports", "Statistics", "Snapshots", "Annotated Videos", "Logout"]
     if st.session_state.user["role"] == "Admin":
         menu_options.insert(1, "Admin Dashboard")
 
@@ -259,6 +533,8 @@ elif choice == "Admin Dashboard":
         st.warning("Admins only. Please log in with an Admin account.")
 elif choice == "Reports":
     show_reports()
+elif choice == "Statistics":
+    show_statistics()
 elif choice == "Snapshots":
     show_snapshots_gallery()
 elif choice == "Annotated Videos":
@@ -2,9 +2,11 @@ import os
 import sqlite3
 import hashlib
 
+from scripts.violation_db import DB_PATH, migrate
+
 # Constants
 USER_DB_PATH = "data/users.db"
-VIOLATION_DB_PATH = "data/violations.db"
+VIOLATION_DB_PATH = DB_PATH
 
 # Ensure data directory exists
 os.makedirs("data", exist_ok=True)
@@ -83,24 +85,5 @@ def delete_user_by_id(user_id):
 # -------------------- Violation Management --------------------
 
 def ensure_violations_table():
-    conn = sqlite3.connect(VIOLATION_DB_PATH)
-    cursor = conn.cursor()
-
-    # Create table if not exists
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS violations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            type TEXT,
-            timestamp TEXT,
-            image_path TEXT
-        )
-    ''')
-
-    # Ensure image_path column exists (redundant here but kept for safety)
-    cursor.execute("PRAGMA table_info(violations)")
-    columns = [col[1] for col in cursor.fetchall()]
-    if "image_path" not in columns:
-        cursor.execute("ALTER TABLE violations ADD COLUMN image_path TEXT")
-
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    # Creates, upgrades and indexes the shared violations store (see scripts/violation_db.py)
+    migrate(VIOLATION_DB_PATH)
\ No newline at end of file
@@ -1,27 +1,16 @@
 # database/init_db.py
 
-import sqlite3
 import os
+import sys
 
-# Create the database folder if it doesn't exist
-os.makedirs("database", exist_ok=True)
+# Runnable as a file (`python database/init_db.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Connect to the database file (it will be created if it doesn't exist)
-conn = sqlite3.connect("database/violations.db")
-c = conn.cursor()
+from scripts.violation_db import DB_PATH, migrate
 
-# Create the violations table
-c.execute("""
-    CREATE TABLE IF NOT EXISTS violations (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        type TEXT,
-        timestamp TEXT,
-        snapshot TEXT,
-        video TEXT
-    )
-""")
+# Creates the shared violations store (or upgrades it to the latest schema)
+# and imports rows from the older per-script databases, including this
+# folder's violations.db.
+migrate()
 
-conn.commit()
-conn.close()
-
-print("✅ Database initialized successfully at 'database/violations.db'")
\ No newline at end of file
+print(f"✅ Database initialized successfully at '{DB_PATH}'")
\ No newline at end of file
@@ -1,30 +1,240 @@
 import smtplib
 import os
+import time
+import queue
+import atexit
+import threading
 from email.message import EmailMessage
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def send_email_alert(subject, body, to_email, attachment_path=None):
-    sender_email = os.getenv("ALERT_EMAIL")
-    sender_password = os.getenv("ALERT_PASSWORD")
+# Point SMTP_HOST/SMTP_PORT at a local SMTP stand-in (SMTP_SSL=0) to test without a real provider
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") == "1"
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "0") == "1"
+SMTP_TIMEOUT = 30
+# Close the pooled connection after this many idle seconds; providers drop it anyway
+SMTP_IDLE_TIMEOUT = 60
+
+# Dispatcher defaults: at most ALERT_RATE_LIMIT mails a minute (0 for no limit), each a digest of
+# up to ALERT_DIGEST_SIZE violations collected for ALERT_DIGEST_WINDOW seconds
+ALERT_TO = os.getenv("ALERT_TO") or os.getenv("ALERT_EMAIL")
+ALERT_RATE_LIMIT = float(os.getenv("ALERT_RATE_LIMIT", "6"))
+ALERT_DIGEST_SIZE = int(os.getenv("ALERT_DIGEST_SIZE", "10"))
+ALERT_DIGEST_WINDOW = float(os.getenv("ALERT_DIGEST_WINDOW", "30"))
+ALERT_RETRIES = 3
+ALERT_BACKOFF = 2.0
+# Violations waiting to be mailed; beyond this they are counted and left out
+MAX_PENDING_ALERTS = 1000
+
+_IMAGE_SUBTYPES = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp"}
 
+def build_message(subject, body, to_email, attachment_paths=()):
     msg = EmailMessage()
-    msg["From"] = sender_email
+    msg["From"] = os.getenv("ALERT_EMAIL")
     msg["To"] = to_email
     msg["Subject"] = subject
     msg.set_content(body)
 
-    if attachment_path and os.path.exists(attachment_path):
-        with open(attachment_path, "rb") as f:
-            file_data = f.read()
-            file_name = os.path.basename(attachment_path)
-            msg.add_attachment(file_data, maintype="image", subtype="jpeg", filename=file_name)
+    for path in attachment_paths:
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                subtype = _IMAGE_SUBTYPES.get(os.path.splitext(path)[1].lower(), "jpeg")
+                msg.add_attachment(f.read(), maintype="image", subtype=subtype, filename=os.path.basename(path))
+    return msg
 
+def connect_smtp(host=SMTP_HOST, port=SMTP_PORT, use_ssl=SMTP_SSL, starttls=SMTP_STARTTLS):
+    """An SMTP connection, logged in when ALERT_PASSWORD is set (local stand-ins need no login)."""
+    if use_ssl:
+        server = smtplib.SMTP_SSL(host, port, timeout=SMTP_TIMEOUT)
+    else:
+        server = smtplib.SMTP(host, port, timeout=SMTP_TIMEOUT)
+        if starttls:
+            server.starttls()
+    sender_password = os.getenv("ALERT_PASSWORD")
+    if sender_password:
+        server.login(os.getenv("ALERT_EMAIL"), sender_password)
+    return server
+
+def send_email_alert(subject, body, to_email, attachment_path=None):
+    """Send one mail right away on its own connection; the caller waits for it.
+
+    For alerts raised while detecting, use the AlertDispatcher instead.
+    """
+    msg = build_message(subject, body, to_email, [attachment_path])
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(sender_email, sender_password)
+        with connect_smtp() as server:
             server.send_message(msg)
             print("📧 Email alert sent!")
     except Exception as e:
-        print("❌ Failed to send email:", e)
\ No newline at end of file
+        print("❌ Failed to send email:", e)
+
+# ---------------- Dispatcher ---------------- #
+
+_STOP = object()
+
+def _permanent(error):
+    """Whether retrying `error` is pointless (rejected sender/recipient, 5xx reply)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+class AlertDispatcher:
+    """Mails violation alerts from a background thread over one reused SMTP connection.
+
+    Calling the dispatcher takes the same arguments as `log_violation` and
+    only queues the violation, so detection never waits on the mail server.
+    Violations are batched into digests of up to `digest_size`, collected
+    for `digest_window` seconds, each listing the violations with their
+    thumbnails attached. At most `rate_limit` mails go out a minute; while
+    waiting for the next slot the digest keeps filling. Failed sends are
+    retried `retries` times with exponential backoff, reconnecting each time.
+    """
+
+    def __init__(self, to_email=ALERT_TO, rate_limit=ALERT_RATE_LIMIT, digest_size=ALERT_DIGEST_SIZE,
+                 digest_window=ALERT_DIGEST_WINDOW, retries=ALERT_RETRIES, backoff=ALERT_BACKOFF,
+                 connect=connect_smtp):
+        if not to_email:
+            raise Exception("No alert recipient: set ALERT_TO or ALERT_EMAIL")
+        self.to_email = to_email
+        self.min_interval = 60.0 / rate_limit if rate_limit else 0.0
+        self.digest_size = max(1, digest_size)
+        self.digest_window = digest_window
+        self.retries = retries
+        self.backoff = backoff
+        self.connect = connect
+        self.queue = queue.Queue(maxsize=MAX_PENDING_ALERTS)
+        self.closing = threading.Event()
+        self.conn = None
+        self.next_send = 0.0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._unreported_drops = 0
+        self._drops_lock = threading.Lock()  # Drops are counted on caller threads
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def __call__(self, violation_type, timestamp, image_path, video_path, snapshot=None):
+        try:
+            self.queue.put_nowait({"type": violation_type, "timestamp": timestamp,
+                                   "image_path": image_path, "video_path": video_path})
+        except queue.Full:
+            with self._drops_lock:
+                self.dropped += 1
+                self._unreported_drops += 1
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=SMTP_IDLE_TIMEOUT if self.conn else None)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            if item is _STOP:
+                break
+            batch, stopping = [item], False
+            try:
+                batch, stopping = self._collect(item)
+                self._send_digest(batch)
+            except Exception as e:
+                # Keep the thread alive: a dead dispatcher would silently queue alerts until full
+                self.failed += len(batch)
+                print(f"[ERROR] Alert mail for {len(batch)} violation(s) not sent: {e}")
+            if stopping:
+                break
+        self._disconnect()
+
+    def _collect(self, first):
+        """Fill a digest until it is full, its window has passed and a send slot is free."""
+        batch = [first]
+        deadline = max(time.monotonic() + self.digest_window, self.next_send)
+        while len(batch) < self.digest_size:
+            # When closing, take only what is already queued
+            timeout = 0 if self.closing.is_set() else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _send_digest(self, batch):
+        if len(batch) == 1:
+            subject = f"🚦 {batch[0]['type']} detected"
+        else:
+            subject = f"🚦 {len(batch)} traffic violations detected"
+        from scripts.violation_db import video_labels
+        labels = video_labels(item["video_path"] for item in batch)
+        lines = [f"- {item['timestamp']}  {item['type']}  {labels[item['video_path']]}  "
+                 f"({os.path.basename(item['image_path'])})" for item in batch]
+        body = "Violations recorded:\n\n" + "\n".join(lines) + "\n"
+        with self._drops_lock:
+            drops, self._unreported_drops = self._unreported_drops, 0
+        if drops:
+            body += f"\n{drops} more violation(s) were not mailed because the alert queue was full.\n"
+
+        from scripts.thumbnails import get_thumbnail
+        msg = build_message(subject, body, self.to_email, [get_thumbnail(item["image_path"]) for item in batch])
+
+        delay = self.next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._deliver(msg, len(batch))
+        self.next_send = time.monotonic() + self.min_interval
+
+    def _deliver(self, msg, count):
+        for attempt in range(self.retries + 1):
+            try:
+                if self.conn is None:
+                    self.conn = self.connect()
+                self.conn.send_message(msg)
+                self.sent += count
+                print(f"[INFO] 📧 Alert mail sent for {count} violation(s)")
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                self._disconnect()
+                if attempt == self.retries or _permanent(e):
+                    self.failed += count
+                    print(f"[ERROR] Alert mail for {count} violation(s) not sent: {e}")
+                    return False
+                delay = self.backoff * 2 ** attempt
+                print(f"[ERROR] Alert mail failed ({e}); retrying in {delay:g}s")
+                time.sleep(delay)
+
+    def _disconnect(self):
+        if self.conn is not None:
+            try:
+                self.conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.conn = None
+
+    def close(self, timeout=30):
+        """Mail what is still queued, without waiting out the digest window, then stop."""
+        if self.closing.is_set():
+            return
+        self.closing.set()
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"[ERROR] Alert dispatcher still sending after {timeout}s; giving up on pending alerts")
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    """The process-wide AlertDispatcher, started on first use and drained at exit."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher()
+            atexit.register(_dispatcher.close)
+        return _dispatcher
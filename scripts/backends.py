@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+
+import numpy as np
+
+# "pytorch" runs the .pt weights as before; "onnx" (ONNX Runtime) and "openvino" run an
+# exported copy on the CPU, created next to the weights the first time it is needed.
+# "stub" is a deterministic fake detector for benchmarks and offline runs (no weights)
+BACKENDS = ("pytorch", "onnx", "openvino", "stub")
+DEFAULT_BACKEND = os.getenv("DETECTION_BACKEND", "pytorch").lower()
+# INT8 variant of the exported model: dynamic weight quantization for ONNX, calibrated
+# post-training quantization (on DETECTION_CALIBRATION_DATA) for OpenVINO
+DEFAULT_INT8 = os.getenv("DETECTION_INT8", "0") == "1"
+CALIBRATION_DATA = os.getenv("DETECTION_CALIBRATION_DATA", "coco8.yaml")
+IMAGE_SIZE = 640
+# Simulated inference cost of the stub detector, per frame
+STUB_INFER_MS = float(os.getenv("DETECTION_STUB_MS", "0"))
+
+# Runner threads may load the same backend at once; export each model only once
+_export_lock = threading.Lock()
+
+def model_path(weights, backend, int8=False):
+    """Where the `backend` copy of `weights` lives once exported."""
+    stem = os.path.splitext(weights)[0]
+    if backend == "onnx":
+        return f"{stem}-int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    return weights
+
+def export_model(weights, backend, int8=False):
+    """Path of the model to load for `backend`, exporting (and quantizing) it if missing."""
+    if backend not in BACKENDS:
+        raise Exception(f"Unknown detection backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    if backend in ("pytorch", "stub"):
+        if int8:
+            raise Exception("INT8 models need the onnx or openvino backend")
+        return weights
+
+    path = model_path(weights, backend, int8)
+    with _export_lock:
+        if os.path.exists(path):
+            return path
+
+        from ultralytics import YOLO
+        print(f"[INFO] Exporting {weights} for {backend}{' (INT8)' if int8 else ''}...")
+        model = YOLO(weights)
+        # Dynamic shapes keep batching and cropped ROIs working on the exported model
+        if backend == "onnx":
+            exported = model.export(format="onnx", dynamic=True, imgsz=IMAGE_SIZE)
+            if int8:
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                quantize_dynamic(exported, path, weight_type=QuantType.QUInt8)
+                return path
+        else:
+            options = {"int8": True, "data": CALIBRATION_DATA} if int8 else {}
+            exported = model.export(format="openvino", dynamic=True, imgsz=IMAGE_SIZE, **options)
+        return str(exported)
+
+def load_backend(weights, backend=DEFAULT_BACKEND, int8=DEFAULT_INT8):
+    """A detector for `weights` on `backend`.
+
+    Real backends all load through ultralytics, so they take the same frames
+    and return the same Results objects as the PyTorch model; the stub
+    mimics that interface.
+    """
+    if backend == "stub":
+        return StubDetector()
+
+    from ultralytics import YOLO
+    path = export_model(weights, backend, int8)
+    print(f"[INFO] Loading {backend}{' INT8' if int8 else ''} model from {path}...")
+    return YOLO(path, task="detect")
+
+# ---------------- Stub detector ---------------- #
+
+class _StubBoxes:
+    def __init__(self, data):
+        self.data = data
+
+class _StubResult:
+    def __init__(self, data):
+        self.boxes = _StubBoxes(data)
+
+class StubDetector:
+    """Deterministic stand-in for a YOLO model: no weights, no network.
+
+    Each call returns, per frame, a motorcycle with one to three riders
+    sliding across the frame. Box positions and confidences depend only on
+    how many frames the detector has seen, so repeated runs produce the same
+    violations. `infer_ms` sleeps per frame to mimic a real model's cost.
+    """
+
+    names = {0: "person", 3: "motorcycle"}
+
+    def __init__(self, infer_ms=STUB_INFER_MS):
+        self.infer_ms = infer_ms
+        self.frames = 0
+
+    def _detect(self, frame):
+        height, width = frame.shape[:2]
+        step = self.frames
+        self.frames += 1
+        bike_w, bike_h = width // 8, height // 6
+        x1 = (step * 7) % max(1, width - bike_w)
+        y1 = height // 2
+        conf = 0.35 + 0.6 * ((step // 5) % 10) / 9  # Steps through 0.35..0.95 every 5 frames
+        rows = [[x1, y1, x1 + bike_w, y1 + bike_h, conf, 3]]
+        for rider in range(1 + (step // 50) % 3):
+            rx1 = x1 + bike_w * (rider + 1) // 5
+            rows.append([rx1, y1 - bike_h // 2, rx1 + bike_w // 5, y1 + bike_h // 2, conf, 0])
+        return _StubResult(np.array(rows, dtype=np.float32))
+
+    def __call__(self, frames, **kwargs):
+        frames = frames if isinstance(frames, list) else [frames]
+        if self.infer_ms:
+            time.sleep(self.infer_ms * len(frames) / 1000)
+        return [self._detect(frame) for frame in frames]
@@ -0,0 +1,69 @@
+import numpy as np
+
+# COCO class IDs used by the stock yolov8n weights
+PERSON_CLS = 0
+MOTORCYCLE_CLS = 3
+# A rider's feet may hang below the motorcycle box by up to this many pixels
+RIDER_MARGIN = 40
+
+def as_array(data):
+    """Detections as a float32 NumPy array, accepting torch tensors (e.g. `results[0].boxes.data`)."""
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    return np.asarray(data, dtype=np.float32).reshape(-1, 6)
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU of two (N, 4) and (M, 4) arrays of x1, y1, x2, y2 boxes."""
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+def containment_matrix(outer, inner, margin=RIDER_MARGIN):
+    """(N, M) mask of `inner` boxes horizontally inside `outer` boxes and not below them.
+
+    Matches the original rider test: px1 > mx1, px2 < mx2 and py2 < my2 + margin.
+    """
+    o = outer[:, None, :]
+    i = inner[None, :, :]
+    return (i[..., 0] > o[..., 0]) & (i[..., 2] < o[..., 2]) & (i[..., 3] < o[..., 3] + margin)
+
+def associate_riders(dets, margin=RIDER_MARGIN, min_conf=0.0):
+    """Pair every motorcycle with the persons riding it, for all pairs at once.
+
+    `dets` is an (N, 6) array or tensor of x1, y1, x2, y2, conf, cls rows.
+    Returns a dict with the motorcycle and person boxes, the (M, P) rider
+    mask and IoU matrix, and the number of riders per motorcycle.
+    """
+    dets = as_array(dets)
+    dets = dets[dets[:, 4] >= min_conf]
+    cls = dets[:, 5].astype(np.int64)
+    motorcycles = dets[cls == MOTORCYCLE_CLS, :4]
+    persons = dets[cls == PERSON_CLS, :4]
+
+    riders = containment_matrix(motorcycles, persons, margin)
+    return {
+        "motorcycles": motorcycles,
+        "persons": persons,
+        "riders": riders,
+        "iou": iou_matrix(motorcycles, persons),
+        "rider_counts": riders.sum(axis=1),
+    }
+
+def anchor_points(dets):
+    """Bottom-centre of each box, where a vehicle meets the road."""
+    return np.stack([(dets[:, 0] + dets[:, 2]) / 2, dets[:, 3]], axis=1)
+
+def points_in_polygon(points, polygon):
+    """(N,) mask of (N, 2) points inside a closed (K, 2) polygon, by ray casting."""
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return (crosses & (x < x_cross)).sum(axis=1) % 2 == 1
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+
+import cv2
+import numpy as np
+
+# Runnable as a file (`python scripts/compare_backends.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.backends import BACKENDS
+from scripts.benchmark import _first_frame
+from scripts.boxes import iou_matrix
+from scripts.engine import CONF_THRESHOLD, DEFAULT_BATCH_SIZE, DEFAULT_WEIGHTS, load_model, read_frames, infer_frames
+
+MATCH_IOU = 0.5
+
+def parse_variant(spec):
+    """Split a variant such as "openvino:int8" into ("openvino", True)."""
+    backend, _, quantization = spec.partition(":")
+    if backend not in BACKENDS or quantization not in ("", "int8"):
+        raise Exception(f"Unknown backend variant: {spec}")
+    return backend, quantization == "int8"
+
+def collect_detections(model, video_path, max_frames=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Detections above CONF_THRESHOLD for each frame, and the seconds decode + inference took."""
+    model([_first_frame(video_path)])  # Warm-up so load and graph compilation aren't timed
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception("Unable to open video file")
+    frames = itertools.islice(read_frames(cap), max_frames)
+    start = time.perf_counter()
+    detections = [dets[dets[:, 4] > CONF_THRESHOLD] for _, _, dets, _ in infer_frames(model, frames, batch_size)]
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return detections, elapsed
+
+def _matches(baseline, candidate):
+    """Greedy one-to-one matches of same-class boxes with IoU >= MATCH_IOU."""
+    if not len(baseline) or not len(candidate):
+        return 0
+    iou = iou_matrix(baseline[:, :4], candidate[:, :4])
+    iou[baseline[:, 5][:, None] != candidate[:, 5][None, :]] = 0
+    matched = 0
+    while True:
+        b, c = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[b, c] < MATCH_IOU:
+            return matched
+        matched += 1
+        iou[b, :] = 0
+        iou[:, c] = 0
+
+def agreement(baseline, candidate):
+    """Precision/recall of `candidate` detections, taking the baseline's as ground truth."""
+    matched = sum(_matches(b, c) for b, c in zip(baseline, candidate))
+    base_total = sum(len(b) for b in baseline)
+    cand_total = sum(len(c) for c in candidate)
+    precision = matched / cand_total if cand_total else 1.0
+    recall = matched / base_total if base_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"detections": cand_total, "precision": round(precision, 4), "recall": round(recall, 4),
+            "f1": round(f1, 4)}
+
+def compare_backends(video_paths, variants, max_frames=None, batch_size=DEFAULT_BATCH_SIZE, weights=DEFAULT_WEIGHTS):
+    """Throughput and agreement of each backend variant against the PyTorch baseline, per clip."""
+    report = []
+    baseline_model = load_model(weights, backend="pytorch", int8=False)
+    for video_path in video_paths:
+        baseline, baseline_seconds = collect_detections(baseline_model, video_path, max_frames, batch_size)
+        frames = len(baseline)
+        rows = [{"variant": "pytorch", "fps": round(frames / baseline_seconds, 2), "speedup": 1.0,
+                 **agreement(baseline, baseline)}]
+        for spec in variants:
+            backend, int8 = parse_variant(spec)
+            if (backend, int8) == ("pytorch", False):
+                continue
+            model = load_model(weights, backend=backend, int8=int8)
+            detections, seconds = collect_detections(model, video_path, max_frames, batch_size)
+            rows.append({"variant": spec, "fps": round(frames / seconds, 2),
+                         "speedup": round(baseline_seconds / seconds, 2), **agreement(baseline, detections)})
+        report.append({"video": video_path, "frames": frames, "backends": rows})
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare inference backends against the PyTorch baseline.")
+    parser.add_argument("video_paths", nargs="+")
+    parser.add_argument("--variants", default="onnx,onnx:int8,openvino,openvino:int8",
+                        help="comma-separated backend[:int8] variants to compare with pytorch")
+    parser.add_argument("--max-frames", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        variants = args.variants.split(",")
+        print(json.dumps(compare_backends(args.video_paths, variants, args.max_frames, args.batch_size), indent=2))
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        sys.exit(1)
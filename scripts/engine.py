@@ -0,0 +1,638 @@
+import sys
+import os
+import cv2
+import time
+import uuid
+import numpy as np
+import argparse
+from datetime import datetime
+
+# Runnable as a file (`python scripts/engine.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import metrics
+from scripts.backends import DEFAULT_BACKEND, DEFAULT_INT8, load_backend
+from scripts.boxes import anchor_points, as_array, points_in_polygon
+from scripts.motion import MotionGate
+from scripts.pipeline import DEFAULT_QUEUE_SIZE, Stage, stage_stats
+from scripts.snapshot_writer import (
+    SNAPSHOT_CROP_MARGIN, SNAPSHOT_FORMAT, SNAPSHOT_QUALITY, SnapshotWriter, encode_snapshot
+)
+from scripts.tracker import Tracker
+from scripts.violation_db import ViolationSink, create_violations_table, log_violation, video_label
+from scripts.zones import camera_zones, inference_region
+
+DEFAULT_WEIGHTS = "yolov8n.pt"
+CONF_THRESHOLD = 0.5
+MAX_SNAPSHOTS = 5
+DEFAULT_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", "1"))
+# Fraction of changed pixels needed to run inference; 0 disables motion gating
+DEFAULT_MOTION_THRESHOLD = float(os.getenv("DETECTION_MOTION_THRESHOLD", "0"))
+DEFAULT_MIN_STRIDE = int(os.getenv("DETECTION_MIN_STRIDE", "30"))
+# One violation per tracked vehicle instead of one per frame (no snapshot cap needed)
+DEFAULT_TRACKING = os.getenv("DETECTION_TRACKING", "1") == "1"
+# Decode, inference and annotate/encode/snapshot stages run on separate threads
+DEFAULT_PIPELINED = os.getenv("DETECTION_PIPELINED", "1") == "1"
+DEFAULT_QUEUE_SIZE = int(os.getenv("DETECTION_QUEUE_SIZE", str(DEFAULT_QUEUE_SIZE)))
+# Annotated video: every frame ("full"), every Nth frame ("every"), only frames where the
+# rule fires ("violations") or none at all ("none", no drawing or encoding)
+OUTPUT_MODES = ("full", "every", "violations", "none")
+DEFAULT_OUTPUT_MODE = os.getenv("DETECTION_OUTPUT_MODE", "full")
+DEFAULT_OUTPUT_STRIDE = int(os.getenv("DETECTION_OUTPUT_STRIDE", "5"))
+BOX_THICKNESS = 2
+# Also mail every recorded violation through mail_utils.AlertDispatcher (batched into digests)
+DEFAULT_ALERTS = os.getenv("DETECTION_ALERTS", "0") == "1"
+# Upper bound on frames held back while a batch fills up behind skipped frames
+MAX_PENDING_FRAMES = 64
+
+# Models are cached per process so repeated runs (or several rules) share one load
+_MODELS = {}
+
+def with_run_defaults(options):
+    """`options` with this process's model and snapshot settings filled in.
+
+    These come from the environment, which may differ between the process
+    that submits a job and the worker that runs it; pinning them in the
+    job's options makes the run and its result-cache key agree.
+    """
+    return {"backend": DEFAULT_BACKEND, "int8": DEFAULT_INT8, "snapshot_format": SNAPSHOT_FORMAT,
+            "snapshot_quality": SNAPSHOT_QUALITY, "snapshot_crop_margin": SNAPSHOT_CROP_MARGIN, **options}
+
+def load_model(weights=DEFAULT_WEIGHTS, slot=0, backend=DEFAULT_BACKEND, int8=DEFAULT_INT8):
+    """Cached model for `weights` on the configured backend (see scripts/backends.py).
+
+    Concurrent jobs each use their own `slot`, since one model instance is
+    not safe to run from two threads at once.
+    """
+    key = (weights, backend, int8, slot)
+    if key not in _MODELS:
+        _MODELS[key] = load_backend(weights, backend, int8)
+    return _MODELS[key]
+
+# ---------------- Rules ---------------- #
+
+class ViolationRule:
+    """A violation check applied to the shared detections of every frame.
+
+    `match` receives an (N, 6) array of x1, y1, x2, y2, conf, cls rows and
+    returns a boolean mask of the boxes that constitute a violation.
+    """
+
+    def __init__(self, name, label, title, conf_threshold=CONF_THRESHOLD):
+        self.name = name
+        self.label = label
+        self.title = title
+        self.conf_threshold = conf_threshold
+
+    def match(self, dets):
+        return dets[:, 4] > self.conf_threshold
+
+RULES = {}
+
+def register_rule(rule):
+    RULES[rule.name] = rule
+    return rule
+
+# Replace these with custom models/logic as they become available
+register_rule(ViolationRule("helmet", "Helmet Violation", "Helmet detection"))
+register_rule(ViolationRule("signal", "Signal Jumping Violation", "Signal detection"))
+register_rule(ViolationRule("lane", "Lane Violation", "Lane violation detection"))
+register_rule(ViolationRule("triple", "Triple Riding Violation", "Triple riding detection"))
+
+class RuleRun:
+    """Per-run output state of one rule: annotated video, snapshots and count.
+
+    In tracking mode the rule keeps the most confident frame of each
+    violating track and records it once, when the track finishes. Snapshot
+    names carry `run_id`, so runs sharing the dated folder never overwrite
+    each other's snapshots (track ids restart in every run).
+    """
+
+    def __init__(self, rule, fps, size, output_dir="output", log=log_violation, max_snapshots=MAX_SNAPSHOTS,
+                 writer=None, output_mode=DEFAULT_OUTPUT_MODE, output_stride=DEFAULT_OUTPUT_STRIDE, zone=None,
+                 run_id=None, video_frames=False):
+        self.rule = rule
+        self.run_id = run_id
+        # Frame numbers written to the annotated video, when asked for (merging segments needs them)
+        self.video_frames = [] if video_frames else None
+        self.zone = zone
+        self.log = log
+        self.max_snapshots = max_snapshots
+        self.writer = writer
+        self.output_mode = output_mode
+        self.output_stride = max(1, output_stride)
+        os.makedirs(f"output/{rule.name}_violations", exist_ok=True)
+
+        self.date_folder = datetime.now().strftime("%Y-%m-%d")
+        self.snapshot_folder = os.path.join(f"snapshots/{rule.name}", self.date_folder)
+        os.makedirs(self.snapshot_folder, exist_ok=True)
+
+        self.out_path = self.out = None
+        if output_mode != "none":
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            os.makedirs(output_dir, exist_ok=True)
+            self.out_path = os.path.join(output_dir, f"{rule.name}_output.mp4")
+            # A decimated video plays back at the same speed as the source
+            out_fps = fps / self.output_stride if output_mode == "every" else fps
+            self.out = cv2.VideoWriter(self.out_path, fourcc, out_fps, size)
+
+        self.snapshots = []
+        self.snapshot_frames = []
+        self.written = set()
+        self.candidates = {}  # track id -> (conf, frame_num, frame, box)
+        self.last_matched = False
+        self.retained = None  # Number of the last frame kept for a snapshot; it must not be drawn on
+
+    @property
+    def active(self):
+        return self.max_snapshots is None or len(self.snapshots) < self.max_snapshots
+
+    def match(self, dets):
+        """The rule's matches, limited to boxes standing inside this camera's zone for it."""
+        matched = self.rule.match(dets)
+        if self.zone is not None and len(dets):
+            matched &= points_in_polygon(anchor_points(dets), self.zone)
+        return matched
+
+    def wants(self, frame_num):
+        """Whether `frame_num` goes into this rule's annotated video."""
+        if self.out is None:
+            return False
+        if self.output_mode == "every":
+            return frame_num % self.output_stride == 0
+        if self.output_mode == "violations":
+            return self.last_matched
+        return True
+
+    def record(self, frame, frame_num, video_path, track_id=None, box=None):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        suffix = f"_{track_id}" if track_id is not None else ""
+        if self.run_id:
+            suffix += f"_{self.run_id}"
+        extension = self.writer.extension if self.writer else f".{SNAPSHOT_FORMAT}"
+        snapshot_filename = f"{self.rule.name}_violation_{frame_num}{suffix}{extension}"
+        snapshot_path = os.path.join(self.snapshot_folder, snapshot_filename)
+
+        # Only a snapshot that made it to disk gets its violation row
+        def written(width, height):
+            self.log(self.rule.label, timestamp, snapshot_path, video_path, snapshot={
+                "category": self.rule.name, "date": self.date_folder, "frame_num": frame_num,
+                "width": width, "height": height,
+            })
+            self.written.add(snapshot_path)
+            metrics.inc("violations_total", rule=self.rule.name)
+
+        self.snapshots.append(snapshot_path)
+        self.snapshot_frames.append(frame_num)
+        self.retained = frame_num
+        if self.writer:
+            self.writer.submit(snapshot_path, frame, written, box)
+        else:
+            written(*encode_snapshot(snapshot_path, frame, box))
+
+    def observe(self, matched, dets, track_ids, frame, frame_num):
+        for i in np.flatnonzero(matched & (track_ids >= 0)):
+            track_id = int(track_ids[i])
+            conf = float(dets[i, 4])
+            best = self.candidates.get(track_id)
+            if best is None or conf > best[0]:
+                self.candidates[track_id] = (conf, frame_num, frame, dets[i, :4])
+                self.retained = frame_num
+
+    def finish(self, track_ids, video_path):
+        events = [(track_id, *self.candidates.pop(track_id)) for track_id in track_ids
+                  if track_id in self.candidates]
+        for track_id, conf, frame_num, frame, box in sorted(events, key=lambda event: event[2]):
+            self.record(frame, frame_num, video_path, track_id, box)
+
+    def close(self):
+        """Release the video and report the snapshots; call once their writer has drained."""
+        if self.out is not None:
+            self.out.release()
+        kept = [(path, frame_num) for path, frame_num in zip(self.snapshots, self.snapshot_frames)
+                if path in self.written]
+        self.snapshots = [path for path, _ in kept]
+        self.snapshot_frames = [frame_num for _, frame_num in kept]
+        print(f"[INFO] {self.rule.title} completed. {len(self.snapshots)} snapshots saved.")
+        outputs = {"output": self.out_path, "snapshots": self.snapshots, "frames": self.snapshot_frames}
+        if self.video_frames is not None:
+            outputs["video_frames"] = self.video_frames
+        return outputs
+
+# ---------------- Annotation ---------------- #
+
+def _class_color(cls):
+    return ((cls * 67 + 40) % 256, (cls * 131 + 90) % 256, (cls * 193 + 160) % 256)
+
+def draw_detections(frame, dets, names):
+    """Draw labelled detection boxes onto `frame` in place and return it."""
+    for x1, y1, x2, y2, conf, cls in dets:
+        cls = int(cls)
+        color = _class_color(cls)
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, BOX_THICKNESS)
+        cv2.putText(frame, f"{names.get(cls, cls)} {conf:.2f}", (int(x1), max(int(y1) - 4, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+    return frame
+
+# ---------------- Stages ---------------- #
+
+def read_frames(cap, start_frame=0, end_frame=None):
+    """Yield (frame_num, frame) from `start_frame` up to, not including, `end_frame`."""
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    frame_num = start_frame
+    while cap.isOpened() and (end_frame is None or frame_num < end_frame):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame_num, frame
+        frame_num += 1
+
+def infer_frames(model, frames, batch_size=1, gate=None, region=None, latency=None):
+    """Run the model on `batch_size` frames per call, yielding detections in frame order.
+
+    Yields (frame_num, frame, dets, fresh) with dets an (N, 6) array in
+    full-frame coordinates. Frames the motion `gate` skips reuse the previous
+    detections with `fresh` set to False. With a `region` (x1, y1, x2, y2),
+    only that crop is gated and inferred; the model letterboxes it like any
+    other input and its boxes are shifted back into the full frame. The time
+    of each model call is reported to the metrics registry and, if given,
+    to the `latency` Summary.
+    """
+    pending = []
+    to_infer = 0
+    last = np.zeros((0, 6), dtype=np.float32)
+    for frame_num, frame in frames:
+        crop = frame[region[1]:region[3], region[0]:region[2]] if region else frame
+        infer = gate is None or gate.should_infer(crop)
+        pending.append((frame_num, frame, crop, infer))
+        to_infer += infer
+        if to_infer == 0 or to_infer >= batch_size or len(pending) >= max(batch_size, MAX_PENDING_FRAMES):
+            last = yield from _infer_batch(model, pending, last, region, latency)
+            pending = []
+            to_infer = 0
+    if pending:
+        yield from _infer_batch(model, pending, last, region, latency)
+
+def _infer_batch(model, pending, last, region=None, latency=None):
+    inferred = [crop for _, _, crop, infer in pending if infer]
+    results = []
+    if inferred:
+        started = time.perf_counter()
+        results = model(inferred)
+        seconds = time.perf_counter() - started
+        metrics.observe("inference_seconds", seconds)
+        if latency:
+            latency.observe(seconds)
+    results = iter(results)
+    for frame_num, frame, _, infer in pending:
+        if infer:
+            last = as_array(next(results).boxes.data)
+            if region:
+                last[:, [0, 2]] += region[0]
+                last[:, [1, 3]] += region[1]
+        yield frame_num, frame, last, infer
+    return last
+
+# ---------------- Engine ---------------- #
+
+def with_alerts(log, alert=None):
+    """`log`, also handing each violation to `alert`.
+
+    With `alert` None the shared AlertDispatcher is used when DEFAULT_ALERTS
+    is on; False turns alerts off.
+    """
+    if alert is None and DEFAULT_ALERTS:
+        from mail_utils import get_dispatcher
+        alert = get_dispatcher()
+    if not alert:
+        return log
+
+    def logged(*row, **meta):
+        log(*row, **meta)
+        alert(*row, **meta)
+    return logged
+
+class RunMetrics:
+    """Reports one run's progress to the metrics registry and the JSON event log.
+
+    The detection loop only updates its own stats; `report` pushes what
+    changed since the previous report, at most every `interval` seconds, so
+    the hot path takes no locks. `seconds` returns the cumulative seconds
+    per stage and `queues` maps queue names to functions giving their depth.
+    Gauges carry the run id as well as the video name, since concurrent jobs
+    on the same (content-addressed) upload share the name.
+    """
+
+    def __init__(self, video_path, stats, seconds, queues, run_id, interval=metrics.METRICS_INTERVAL):
+        self.source = video_label(str(video_path))
+        self.run_id = run_id
+        self.stats = stats
+        self.seconds = seconds
+        self.queues = queues
+        self.interval = interval
+        self.pushed = {}
+        self.last = time.perf_counter()
+        self.last_frames = 0
+        metrics.add("runs_active", 1)
+
+    def due(self, now):
+        return now - self.last >= self.interval
+
+    def report(self, now=None):
+        now = now or time.perf_counter()
+        for result in ("inferred", "skipped"):
+            delta = self.stats[result] - self.pushed.get(result, 0)
+            if delta:
+                metrics.inc("frames_total", delta, result=result)
+            self.pushed[result] = self.stats[result]
+        for stage, seconds in self.seconds().items():
+            delta = seconds - self.pushed.get(stage, 0.0)
+            if delta:
+                metrics.inc("stage_seconds_total", delta, stage=stage)
+            self.pushed[stage] = seconds
+
+        fps = round((self.stats["frames"] - self.last_frames) / (now - self.last), 2) if now > self.last else 0.0
+        depths = {name: depth() for name, depth in self.queues.items()}
+        metrics.REGISTRY.set("fps", fps, source=self.source, run=self.run_id)
+        for name, depth in depths.items():
+            metrics.REGISTRY.set("queue_depth", depth, queue=name, source=self.source, run=self.run_id)
+        metrics.log_event("run_progress", source=self.source, run=self.run_id, frames=self.stats["frames"], fps=fps,
+                          queue_depth=depths)
+        self.last = now
+        self.last_frames = self.stats["frames"]
+
+    def close(self, status):
+        """Push the final counts and drop the run's gauges."""
+        self.report()
+        metrics.add("runs_active", -1)
+        metrics.inc("runs_total", status=status)
+        metrics.REGISTRY.remove("fps", source=self.source, run=self.run_id)
+        for name in self.queues:
+            metrics.REGISTRY.remove("queue_depth", queue=name, source=self.source, run=self.run_id)
+        if status == "failed":
+            metrics.log_event("run_failed", source=self.source, run=self.run_id, frames=self.stats["frames"])
+
+def run_engine(video_path, modules=None, start_frame=0, end_frame=None, **options):
+    """Decode and infer each frame of `video_path` once, then apply every requested rule to it.
+
+    Each rule keeps the outputs of its standalone script: its own annotated
+    video, dated snapshot folder and `violations` rows. `start_frame` and
+    `end_frame` restrict the run to a frame range; `options` are passed on
+    to `process_frames`.
+
+    Returns {"outputs": {module: {"output": ..., "snapshots": [...], "frames": [...]}},
+    "stats": {...}}.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception("Unable to open video file")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(3))
+    height = int(cap.get(4))
+    try:
+        return process_frames(read_frames(cap, start_frame, end_frame), video_path, fps, (width, height),
+                              modules, **options)
+    finally:
+        cap.release()
+
+def process_frames(frames, video_path, fps, size, modules=None, model=None, batch_size=DEFAULT_BATCH_SIZE,
+                   motion_threshold=DEFAULT_MOTION_THRESHOLD, min_stride=DEFAULT_MIN_STRIDE,
+                   pipelined=DEFAULT_PIPELINED, queue_size=DEFAULT_QUEUE_SIZE,
+                   track=DEFAULT_TRACKING, output_dir="output", log=None,
+                   max_snapshots=MAX_SNAPSHOTS, output_mode=DEFAULT_OUTPUT_MODE,
+                   output_stride=DEFAULT_OUTPUT_STRIDE, camera=None, progress=None, cancel=None, alert=None,
+                   run_id=None, video_frames=False, backend=DEFAULT_BACKEND, int8=DEFAULT_INT8,
+                   snapshot_format=SNAPSHOT_FORMAT, snapshot_quality=SNAPSHOT_QUALITY,
+                   snapshot_crop_margin=SNAPSHOT_CROP_MARGIN):
+    """Run the rules over an iterable of (frame_num, frame) pairs.
+
+    Frames are inferred `batch_size` at a time but recorded strictly in
+    frame order. With a `motion_threshold`, static frames skip inference
+    and rules; their annotated output reuses the last detections. When
+    `pipelined`, reading frames and inference each run on their own thread
+    behind queues of `queue_size` frames, while annotation, encoding and
+    snapshots stay on this thread.
+
+    With `track`, detections are linked across frames and each violating
+    track produces one row with its most confident snapshot. Otherwise every
+    violating frame is recorded and a rule stops after `max_snapshots`
+    snapshots (None for no limit). Annotated videos go to `output_dir`
+    according to `output_mode` (see OUTPUT_MODES); boxes are drawn onto the
+    decoded frame itself unless a snapshot still holds it. With a `camera`
+    that has zones configured (see scripts/zones.py), each rule only fires
+    inside its zone and inference runs on the crop around the zones when
+    every rule has one. Each violation row is passed to `log`; by default
+    rows go through a ViolationSink that is flushed even if the run is
+    interrupted. Rows are also passed to `alert`, if given (see
+    `with_alerts`).
+
+    `run_id` tells this run's snapshots apart from other runs' on the same
+    day; a random one is used when it is not given. With `video_frames`,
+    each rule's outputs also list the frame numbers in its annotated video.
+    Without a `model`, the `backend`/`int8` one is loaded; snapshots are
+    written as `snapshot_format` with the given quality and crop margin.
+
+    `progress` is called with the number of frames processed after every
+    frame. When `cancel` returns true the run stops early, keeping what it
+    has recorded so far, and its stats are marked `cancelled`.
+    """
+    unknown = [name for name in (modules or []) if name not in RULES]
+    if unknown:
+        raise Exception(f"Unknown detection module(s): {', '.join(unknown)}")
+
+    if output_mode not in OUTPUT_MODES:
+        raise Exception(f"Unknown output mode: {output_mode}")
+
+    rules = [RULES[name] for name in (modules or RULES)]
+    model = model or load_model(backend=backend, int8=int8)
+    names = model.names if isinstance(model.names, dict) else dict(enumerate(model.names))
+    gate = MotionGate(motion_threshold, min_stride) if motion_threshold else None
+    zones = camera_zones(camera, size) if camera else {}
+    region = inference_region([zones.get(rule.name) for rule in rules], size)
+    run_id = run_id or uuid.uuid4().hex[:8]
+    sink = None
+    if log is None:
+        sink = log = ViolationSink()
+    log = with_alerts(log, alert)
+    writer = SnapshotWriter(fmt=snapshot_format, quality=snapshot_quality, crop_margin=snapshot_crop_margin)
+    runs = []
+    try:
+        for rule in rules:
+            runs.append(RuleRun(rule, fps, size, output_dir, log, None if track else max_snapshots, writer,
+                                output_mode, output_stride, zones.get(rule.name), run_id, video_frames))
+    except BaseException:
+        # Nothing was processed yet; stop the writer and sink threads and release the videos opened so far
+        for run in runs:
+            if run.out is not None:
+                run.out.release()
+        writer.close()
+        if sink:
+            sink.close()
+        raise
+    tracker = Tracker() if track else None
+    latency = metrics.Summary()
+
+    queues = {"snapshot": lambda: writer.queued}
+    if pipelined:
+        decode = Stage("decode", frames, queue_size)
+        infer = Stage("infer", infer_frames(model, decode, batch_size, gate, region, latency), queue_size,
+                      upstream=decode)
+        frames = infer
+        queues.update(decode=decode.queue.qsize, infer=infer.queue.qsize)
+    else:
+        frames = infer_frames(model, frames, batch_size, gate, region, latency)
+
+    stats = {"frames": 0, "inferred": 0, "skipped": 0}
+    if region:
+        stats["region"] = [int(v) for v in region]
+        print(f"[INFO] Inferring on the camera zones only: region {stats['region']} of {size[0]}x{size[1]}")
+    started = time.perf_counter()
+    write_seconds = 0.0
+    timings = {"rules": 0.0, "annotate": 0.0, "encode": 0.0}
+
+    def stage_seconds():
+        return {**timings, "decode": decode.produce_seconds} if pipelined else timings
+
+    run_metrics = RunMetrics(video_path, stats, stage_seconds, queues, run_id)
+    status = "failed"
+    try:
+        for frame_num, frame, dets, fresh in frames:
+            write_started = time.perf_counter()
+            stats["frames"] += 1
+            if fresh:
+                stats["inferred"] += 1
+                if tracker:
+                    track_ids, finished = tracker.update(dets)
+            else:
+                stats["skipped"] += 1
+
+            writing = []
+            for run in runs:
+                if not run.active:
+                    continue
+                if fresh:
+                    matched = run.match(dets)
+                    run.last_matched = bool(matched.any())
+                    if tracker:
+                        run.observe(matched, dets, track_ids, frame, frame_num)
+                        run.finish(finished, video_path)
+                    elif run.last_matched:
+                        # Crop (when enabled) to the union of the violating boxes
+                        boxes = dets[matched, :4]
+                        run.record(frame, frame_num, video_path,
+                                   box=(*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0)))
+                if run.wants(frame_num):
+                    writing.append(run)
+
+            rules_done = time.perf_counter()
+            timings["rules"] += rules_done - write_started
+            if writing:
+                # Snapshots are encoded from the clean frame, so only those frames get a copy
+                canvas = frame.copy() if any(run.retained == frame_num for run in runs) else frame
+                draw_detections(canvas, dets, names)
+                drawn = time.perf_counter()
+                timings["annotate"] += drawn - rules_done
+                for run in writing:
+                    run.out.write(canvas)
+                    if run.video_frames is not None:
+                        run.video_frames.append(frame_num)
+                timings["encode"] += time.perf_counter() - drawn
+
+            write_done = time.perf_counter()
+            write_seconds += write_done - write_started
+            if run_metrics.due(write_done):
+                run_metrics.report(write_done)
+            if progress:
+                progress(stats["frames"])
+            if cancel and cancel():
+                stats["cancelled"] = True
+                break
+            if not any(run.active for run in runs):
+                break
+        status = "cancelled" if stats.get("cancelled") else "completed"
+    finally:
+        if pipelined:
+            infer.close()
+        try:
+            # Tracks still open at the end (or on interrupt) are violations too
+            if tracker:
+                finished = tracker.flush()
+                for run in runs:
+                    run.finish(finished, video_path)
+        finally:
+            # Rows are logged as their snapshots land, so drain the writer before the sink
+            try:
+                writer.close()
+                if sink:
+                    sink.close()
+            finally:
+                run_metrics.close(status)
+
+    elapsed = time.perf_counter() - started
+    # Seconds per step of the write side; snapshot encoding and DB writes run on their own threads
+    timings.update(snapshot=writer.busy_seconds, db=sink.busy_seconds if sink else None)
+    stats["timings"] = {name: round(seconds, 4) if seconds is not None else None
+                        for name, seconds in timings.items()}
+    stats["fps"] = round(stats["frames"] / elapsed, 2) if elapsed else None
+    stats["inference_ms"] = {f"p{int(q * 100)}": round(1000 * seconds, 2) if seconds is not None else None
+                             for q, seconds in latency.quantiles().items()}
+    if pipelined:
+        stats["stages"] = {
+            "decode": decode.stats(elapsed),
+            "infer": infer.stats(elapsed),
+            "write": stage_stats(stats["frames"], write_seconds, elapsed),
+        }
+
+    print(f"[INFO] Processed {stats['frames']} frames: {stats['inferred']} inferred, "
+          f"{stats['skipped']} skipped as static.")
+    for name, stage in stats.get("stages", {}).items():
+        print(f"[INFO] {name}: {stage['items_per_second']} items/s, {stage['utilization']:.0%} busy")
+    metrics.log_event("run_finished", source=run_metrics.source, run=run_id, video=video_path, modules=[r.name for r in rules],
+                      status=status, elapsed=round(elapsed, 3), **stats)
+    return {"outputs": {run.rule.name: run.close() for run in runs}, "stats": stats}
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Run several violation rules in a single pass over a video.")
+    parser.add_argument("video_path")
+    parser.add_argument("modules", nargs="*", metavar="module",
+                        help=f"rules to apply ({', '.join(RULES)}); all when omitted")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="frames per inference call")
+    parser.add_argument("--motion-threshold", type=float, default=DEFAULT_MOTION_THRESHOLD,
+                        help="fraction of changed pixels needed to run inference (0 disables gating)")
+    parser.add_argument("--min-stride", type=int, default=DEFAULT_MIN_STRIDE,
+                        help="infer at least once every N frames even when the scene is static")
+    parser.add_argument("--no-pipeline", dest="pipelined", action="store_false", default=DEFAULT_PIPELINED,
+                        help="decode, infer and encode on a single thread")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="frames buffered between pipeline stages")
+    parser.add_argument("--no-track", dest="track", action="store_false", default=DEFAULT_TRACKING,
+                        help="record every violating frame (capped) instead of one violation per vehicle")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default=DEFAULT_OUTPUT_MODE,
+                        help="annotated video: every frame, every Nth frame, violating frames only, or none")
+    parser.add_argument("--output-stride", type=int, default=DEFAULT_OUTPUT_STRIDE,
+                        help="N for --output-mode every")
+    parser.add_argument("--camera", help="camera whose zones (see config/cameras.example.json) apply")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="split the video into segments processed in parallel (0 = one per core)")
+    return parser
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    create_violations_table()
+
+    options = dict(batch_size=args.batch_size, motion_threshold=args.motion_threshold,
+                   min_stride=args.min_stride, pipelined=args.pipelined, queue_size=args.queue_size,
+                   track=args.track, output_mode=args.output_mode, output_stride=args.output_stride,
+                   camera=args.camera)
+    try:
+        if args.workers == 1:
+            run_engine(args.video_path, args.modules or None, **options)
+        else:
+            from scripts.segments import run_segmented
+            run_segmented(args.video_path, args.modules or None, args.workers, **options)
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        sys.exit(1)
@@ -1,9 +1,15 @@
+import sys
 import os
-from ultralytics import YOLO
 import cv2
 
-# 🧠 Load YOLOv8 model
-model = YOLO("yolov8n.pt")  # You can switch to yolov8s/m/l for more accuracy
+# Runnable as a file (`python scripts/helmet_violation.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.boxes import associate_riders
+from scripts.engine import load_model
+
+# 🧠 Load YOLOv8 model on the configured backend (DETECTION_BACKEND)
+model = load_model("yolov8n.pt")  # You can switch to yolov8s/m/l for more accuracy
 
 # 📂 Input video selection
 video_folder = "input_videos"
@@ -47,34 +53,20 @@ while cap.isOpened():
 
     frame = cv2.resize(frame, (640, 480))
     results = model(frame)
-    detections = results[0].boxes.data
-
-    motorcycles = []
-    persons = []
-
-    for det in detections:
-        x1, y1, x2, y2, conf, cls = det
-        cls = int(cls)
-        if cls == 3:  # Motorcycle
-            motorcycles.append((int(x1), int(y1), int(x2), int(y2)))
-        elif cls == 0:  # Person
-            persons.append((int(x1), int(y1), int(x2), int(y2)))
-
-    for (mx1, my1, mx2, my2) in motorcycles:
-        for (px1, py1, px2, py2) in persons:
-            # Check if person is inside motorcycle bounding box
-            if px1 > mx1 and px2 < mx2 and py2 < my2 + 40:
-                violation_id += 1
-                cv2.rectangle(frame, (mx1, my1), (mx2, my2), (0, 0, 255), 2)
-                cv2.putText(frame, "No Helmet", (mx1, my1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-
-                # Save violation image
-                base_name = os.path.splitext(os.path.basename(selected_video))[0]
-                save_path = os.path.join(output_folder, f"{base_name}_violation_{violation_id}.jpg")
-                cv2.imwrite(save_path, frame)
-                print(f"[!] Violation saved: {save_path}")
-                break
+    association = associate_riders(results[0].boxes.data)
+
+    # One violation per motorcycle carrying at least one person
+    for mx1, my1, mx2, my2 in association["motorcycles"][association["rider_counts"] > 0].astype(int):
+        violation_id += 1
+        cv2.rectangle(frame, (mx1, my1), (mx2, my2), (0, 0, 255), 2)
+        cv2.putText(frame, "No Helmet", (mx1, my1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+        # Save violation image
+        base_name = os.path.splitext(os.path.basename(selected_video))[0]
+        save_path = os.path.join(output_folder, f"{base_name}_violation_{violation_id}.jpg")
+        cv2.imwrite(save_path, frame)
+        print(f"[!] Violation saved: {save_path}")
 
     # 🔍 Live preview
     cv2.imshow("Helmet Violation Detection", frame)
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import traceback
+
+import cv2
+
+from scripts import result_cache
+from scripts.engine import load_model, run_engine, with_run_defaults
+from scripts.segments import DEFAULT_SEGMENT_WORKERS, run_segmented
+from scripts.violation_db import DB_PATH, violations_for_images
+
+# Jobs run at the same time; each holds its own model, so this also bounds memory
+DEFAULT_JOB_WORKERS = int(os.getenv("DETECTION_JOB_WORKERS", "1"))
+JOBS_OUTPUT_DIR = "output/jobs"
+ACTIVE_STATUSES = ("queued", "running")
+PROGRESS_INTERVAL = 1.0  # seconds between progress writes (and cancel checks)
+POLL_INTERVAL = 2.0      # seconds an idle runner waits before looking for queued jobs again
+
+JOB_COLUMNS = [
+    "id", "video_path", "modules", "options", "submitted_by", "status", "total_frames", "frames_done", "fps",
+    "cancel_requested", "error", "result", "created_at", "started_at", "updated_at", "finished_at",
+]
+
+def _connect(db_path=DB_PATH):
+    # Runners write progress while the app reads it; wait out each other's locks
+    return sqlite3.connect(db_path, timeout=30)
+
+def _job_dict(row):
+    job = dict(zip(JOB_COLUMNS, row))
+    for key in ("modules", "options", "result"):
+        job[key] = json.loads(job[key]) if job[key] else None
+    return job
+
+# ---------------- Job records ---------------- #
+
+def create_job(video_path, modules=None, options=None, submitted_by=None, db_path=DB_PATH):
+    conn = _connect(db_path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (video_path, modules, options, submitted_by, created_at) VALUES (?, ?, ?, ?, ?)",
+                (video_path, json.dumps(modules), json.dumps(with_run_defaults(options or {})), submitted_by,
+                 time.time())
+            )
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+def get_job(job_id, db_path=DB_PATH):
+    conn = _connect(db_path)
+    try:
+        row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _job_dict(row) if row else None
+
+def list_jobs(submitted_by=None, statuses=None, limit=20, db_path=DB_PATH):
+    """Most recent jobs first, optionally for one user and/or in the given statuses."""
+    where, params = [], []
+    if submitted_by is not None:
+        where.append("submitted_by = ?")
+        params.append(submitted_by)
+    if statuses:
+        where.append(f"status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+    sql = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC LIMIT ?"
+    conn = _connect(db_path)
+    try:
+        return [_job_dict(row) for row in conn.execute(sql, params + [limit])]
+    finally:
+        conn.close()
+
+def request_cancel(job_id, db_path=DB_PATH):
+    """Cancel a queued job outright; ask a running one to stop at its next progress check."""
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                         (time.time(), job_id))
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+    finally:
+        conn.close()
+
+def claim_next_job(db_path=DB_PATH):
+    """Atomically mark the oldest queued job as running and return it, or None."""
+    conn = _connect(db_path)
+    try:
+        with conn:
+            row = conn.execute("""
+                UPDATE jobs SET status = 'running', started_at = ?, updated_at = ?
+                WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1)
+                RETURNING id
+            """, (time.time(), time.time())).fetchone()
+    finally:
+        conn.close()
+    return get_job(row[0], db_path) if row else None
+
+def requeue_interrupted(db_path=DB_PATH):
+    """Put jobs left running by a worker that died back in the queue."""
+    conn = _connect(db_path)
+    try:
+        with conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', frames_done = 0, fps = NULL WHERE status = 'running'"
+            ).rowcount
+    finally:
+        conn.close()
+
+def _finish_job(job_id, status, result=None, error=None, db_path=DB_PATH):
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), time.time(),
+                 job_id)
+            )
+    finally:
+        conn.close()
+
+def eta_seconds(job):
+    """Seconds left for a running job at its current speed, or None when unknown."""
+    if job["status"] != "running" or not job["fps"] or not job["total_frames"]:
+        return None
+    return max(0.0, (job["total_frames"] - job["frames_done"]) / job["fps"])
+
+def wait_for_job(job_id, poll=0.5, db_path=DB_PATH):
+    """Block until the job leaves the queue and return its final record."""
+    while True:
+        job = get_job(job_id, db_path)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            return job
+        time.sleep(poll)
+
+# ---------------- Runners ---------------- #
+
+class JobProgress:
+    """Progress callback for one job: writes frames/FPS at most once per
+    PROGRESS_INTERVAL and picks up cancel requests in the same round trip."""
+
+    def __init__(self, job_id, total_frames, db_path=DB_PATH):
+        self.job_id = job_id
+        self.db_path = db_path
+        self.started = time.monotonic()
+        self.last_write = 0.0
+        self.cancelled = False
+        conn = _connect(db_path)
+        try:
+            with conn:
+                conn.execute("UPDATE jobs SET total_frames = ? WHERE id = ?", (total_frames, job_id))
+        finally:
+            conn.close()
+
+    def __call__(self, frames_done):
+        now = time.monotonic()
+        if now - self.last_write < PROGRESS_INTERVAL:
+            return
+        self.last_write = now
+        fps = frames_done / (now - self.started)
+        conn = _connect(self.db_path)
+        try:
+            with conn:
+                conn.execute("UPDATE jobs SET frames_done = ?, fps = ?, updated_at = ? WHERE id = ?",
+                             (frames_done, fps, time.time(), self.job_id))
+                self.cancelled = bool(conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?",
+                                                   (self.job_id,)).fetchone()[0])
+        finally:
+            conn.close()
+
+def _total_frames(video_path):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    finally:
+        cap.release()
+
+def _cache_result(job, result):
+    # A failed cache write must not fail a finished job
+    try:
+        key = result_cache.cache_key(job["video_path"], job["modules"], **job["options"])
+        result_cache.store(key, result)
+    except Exception as e:
+        print(f"[ERROR] Could not cache result of job {job['id']}: {e}")
+
+def run_job(job, slot=0, db_path=DB_PATH):
+    """Run one claimed job to completion, recording its outcome on the job row."""
+    options = with_run_defaults(job["options"])  # Jobs queued before settings were pinned
+    workers = options.pop("workers", DEFAULT_SEGMENT_WORKERS)
+    # Concurrent jobs must not overwrite each other's annotated videos
+    options["output_dir"] = os.path.join(JOBS_OUTPUT_DIR, str(job["id"]))
+    options["run_id"] = f"job{job['id']}"
+    progress = JobProgress(job["id"], _total_frames(job["video_path"]), db_path)
+    print(f"[INFO] Job {job['id']}: running {job['modules'] or 'all rules'} on {job['video_path']}")
+    try:
+        if workers == 1:
+            model = load_model(slot=slot, backend=options["backend"], int8=options["int8"])
+            result = run_engine(job["video_path"], job["modules"], model=model,
+                                progress=progress, cancel=lambda: progress.cancelled, **options)
+        else:
+            result = run_segmented(job["video_path"], job["modules"], workers,
+                                   progress=progress, cancel=lambda: progress.cancelled, **options)
+        result["violations"] = violations_for_images(
+            [path for outputs in result["outputs"].values() for path in outputs["snapshots"]], db_path)
+    except Exception as e:
+        print(f"[ERROR] Job {job['id']} failed: {e}")
+        _finish_job(job["id"], "failed", error=traceback.format_exc(), db_path=db_path)
+        return
+
+    if result["stats"].get("cancelled"):
+        _finish_job(job["id"], "cancelled", result, db_path=db_path)
+        return
+    _cache_result(job, result)
+    _finish_job(job["id"], "done", result, db_path=db_path)
+
+class JobRunner(threading.Thread):
+    """Takes queued jobs off the jobs table one at a time using model `slot`."""
+
+    def __init__(self, slot, wake, db_path=DB_PATH):
+        super().__init__(name=f"job-runner-{slot}", daemon=True)
+        self.slot = slot
+        self.wake = wake
+        self.db_path = db_path
+
+    def run(self):
+        load_model(slot=self.slot)  # Warm up before taking jobs
+        while True:
+            job = claim_next_job(self.db_path)
+            if job is None:
+                self.wake.wait(POLL_INTERVAL)
+                self.wake.clear()
+                continue
+            run_job(job, self.slot, self.db_path)
+
+def start_runners(count=DEFAULT_JOB_WORKERS, db_path=DB_PATH):
+    """Start `count` runner threads; set the returned event to wake them for new jobs.
+
+    Jobs still marked running are requeued first, so only the one worker that
+    owns the worker port may call this (see `worker.serve`).
+    """
+    count = max(1, count)
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // count))  # Share the cores between jobs
+    except ImportError:
+        pass
+
+    requeued = requeue_interrupted(db_path)
+    if requeued:
+        print(f"[INFO] Requeued {requeued} job(s) interrupted by a previous worker")
+    wake = threading.Event()
+    for slot in range(count):
+        JobRunner(slot, wake, db_path).start()
+    return wake
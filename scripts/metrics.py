@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Port of the Prometheus endpoint started by the worker and the stream CLI; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Local scrapers only by default
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Structured JSON events, one per line; empty disables them
+METRICS_LOG = os.getenv("METRICS_LOG", "logs/metrics.jsonl")
+# Seconds between pushes of a run's counters, gauges and progress event
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "5"))
+METRICS_PREFIX = "detection_"
+QUANTILES = (0.5, 0.9, 0.99)
+# Percentiles are taken over this many of the most recent observations
+SAMPLE_WINDOW = 1024
+
+# name -> (type, help) of every metric the pipeline reports
+METRICS = {
+    "runs_active": ("gauge", "Detection runs in progress"),
+    "runs_total": ("counter", "Finished detection runs by status"),
+    "frames_total": ("counter", "Frames processed, by whether they were inferred or skipped as static"),
+    "frames_dropped_total": ("counter", "Live frames dropped before inference, by reason"),
+    "fps": ("gauge", "Frames per second of a run over the last interval"),
+    "stage_seconds_total": ("counter", "Seconds spent in each stage of the detection loop"),
+    "inference_seconds": ("summary", "Latency of one model call (one batch)"),
+    "queue_depth": ("gauge", "Items waiting in each pipeline queue"),
+    "violations_total": ("counter", "Violations recorded, by rule"),
+    "snapshot_write_seconds": ("summary", "Time to encode and write one snapshot"),
+    "snapshot_failures_total": ("counter", "Snapshots that could not be written"),
+    "db_flush_seconds": ("summary", "Time to write one batch of violation rows"),
+    "db_rows_total": ("counter", "Violation rows written to the database"),
+}
+
+class Summary:
+    """Count, sum and a sliding window of recent observations for percentiles."""
+
+    def __init__(self, window=SAMPLE_WINDOW):
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.count += 1
+            self.sum += value
+            self.samples.append(value)
+
+    def quantiles(self, quantiles=QUANTILES):
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return {q: None for q in quantiles}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in quantiles}
+
+class Registry:
+    """Thread-safe counters, gauges and summaries, keyed by name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.summaries = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def add(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def remove(self, name, **labels):
+        """Drop a gauge whose labels are going away, e.g. the FPS of a finished run."""
+        with self.lock:
+            self.gauges.pop((name, tuple(sorted(labels.items()))), None)
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            summary = self.summaries.get(key)
+            if summary is None:
+                summary = self.summaries[key] = Summary()
+        summary.observe(value)
+
+    def snapshot(self):
+        """Every metric as plain JSON-ready data."""
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            summaries = dict(self.summaries)
+        data = {}
+        for values in (counters, gauges):
+            for (name, labels), value in values.items():
+                data.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), summary in summaries.items():
+            data.setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": summary.count,
+                "sum": round(summary.sum, 6),
+                "quantiles": {str(q): v for q, v in summary.quantiles().items()},
+            })
+        return data
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for name, series in sorted(self.snapshot().items()):
+            full = METRICS_PREFIX + name
+            kind, help_text = METRICS.get(name, ("untyped", name))
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            for item in series:
+                if "value" in item:
+                    lines.append(f"{full}{_labels(item['labels'])} {item['value']}")
+                    continue
+                for q, value in item["quantiles"].items():
+                    if value is not None:
+                        lines.append(f"{full}{_labels({**item['labels'], 'quantile': q})} {value}")
+                lines.append(f"{full}_sum{_labels(item['labels'])} {item['sum']}")
+                lines.append(f"{full}_count{_labels(item['labels'])} {item['count']}")
+        return "\n".join(lines) + "\n"
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+# The process-wide registry the pipeline reports into
+REGISTRY = Registry()
+inc = REGISTRY.inc
+add = REGISTRY.add
+observe = REGISTRY.observe
+
+# ---------------- JSON event log ---------------- #
+
+_log_lock = threading.Lock()
+
+def log_event(event, path=METRICS_LOG, **fields):
+    """Append one {"ts", "event", ...} JSON line to the metrics log."""
+    if not path:
+        return
+    record = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str)
+    with _log_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write(record + "\n")
+
+# ---------------- Endpoint ---------------- #
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body = REGISTRY.render().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body = json.dumps(REGISTRY.snapshot()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # A scrape every few seconds would flood the worker log
+
+def serve_metrics(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics (Prometheus) and /metrics.json from a background thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"[INFO] Metrics available at http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,45 @@
+import cv2
+
+# A downscaled pixel counts as changed when its grey level moves by more than this
+PIXEL_DELTA = 25
+GATE_WIDTH = 160
+
+class MotionGate:
+    """Cheap pre-filter that skips inference on frames with no meaningful change.
+
+    Each frame is downscaled to GATE_WIDTH, converted to grey and compared with
+    the last frame that was actually inferred. Inference runs when at least
+    `threshold` of the pixels changed, or when `min_stride` frames have gone by
+    since the last inference, so a static scene is still re-checked regularly.
+    """
+
+    def __init__(self, threshold, min_stride=30):
+        self.threshold = threshold
+        self.min_stride = min_stride
+        self.reference = None
+        self.since_inferred = 0
+        self.inferred = 0
+        self.skipped = 0
+
+    def _downscale(self, frame):
+        height, width = frame.shape[:2]
+        size = (GATE_WIDTH, max(1, height * GATE_WIDTH // width))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def should_infer(self, frame):
+        small = self._downscale(frame)
+        self.since_inferred += 1
+
+        if self.reference is not None and (not self.min_stride or self.since_inferred < self.min_stride):
+            changed = cv2.countNonZero(cv2.threshold(cv2.absdiff(small, self.reference),
+                                                     PIXEL_DELTA, 255, cv2.THRESH_BINARY)[1])
+            if changed < self.threshold * small.size:
+                self.skipped += 1
+                return False
+
+        self.reference = small
+        self.since_inferred = 0
+        self.inferred += 1
+        return True
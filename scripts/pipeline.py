@@ -0,0 +1,95 @@
+import time
+import queue
+import threading
+
+DEFAULT_QUEUE_SIZE = 8
+
+_DONE = object()
+
+class Stage:
+    """Runs an iterable on its own thread and hands its items over a bounded queue.
+
+    A full queue blocks the producing thread, so a slow downstream stage
+    throttles the stages before it and memory stays flat on long videos.
+    Iterating the stage yields the items in order and re-raises any error
+    from the producing thread.
+    """
+
+    def __init__(self, name, iterable, maxsize=DEFAULT_QUEUE_SIZE, upstream=None):
+        self.name = name
+        self.upstream = upstream
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.items = 0
+        self.produce_seconds = 0.0   # Time spent inside the iterable, incl. waiting on upstream
+        self.consumer_wait = 0.0     # Time the downstream stage spent waiting on this queue
+        self.max_depth = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(iterable,), name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                self.max_depth = max(self.max_depth, self.queue.qsize())
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, iterable):
+        iterator = iter(iterable)
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    self.produce_seconds += time.perf_counter() - start
+                self.items += 1
+                if not self._put(item):
+                    break
+        except Exception as e:
+            self._put(e)
+            return
+        self._put(_DONE)
+
+    def __iter__(self):
+        while True:
+            start = time.perf_counter()
+            item = self.queue.get()
+            self.consumer_wait += time.perf_counter() - start
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        """Stop the producing thread (and everything upstream of it)."""
+        self._stop.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+        if self.upstream:
+            self.upstream.close()
+
+    def stats(self, elapsed):
+        busy = self.produce_seconds - (self.upstream.consumer_wait if self.upstream else 0.0)
+        return stage_stats(self.items, busy, elapsed, self.max_depth)
+
+def stage_stats(items, busy, elapsed, max_depth=None):
+    stats = {
+        "items": items,
+        "busy_seconds": round(busy, 3),
+        "items_per_second": round(items / elapsed, 2) if elapsed else None,
+        "utilization": round(busy / elapsed, 2) if elapsed else None,
+    }
+    if max_depth is not None:
+        stats["max_queue_depth"] = max_depth
+    return stats
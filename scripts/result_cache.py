@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+
+from scripts.engine import (
+    CONF_THRESHOLD, DEFAULT_MIN_STRIDE, DEFAULT_MOTION_THRESHOLD, DEFAULT_OUTPUT_MODE, DEFAULT_OUTPUT_STRIDE,
+    DEFAULT_TRACKING, DEFAULT_WEIGHTS, MAX_SNAPSHOTS, RULES, with_run_defaults
+)
+from scripts.zones import camera_config
+
+RESULT_CACHE_DIR = "cache/results"
+# Least recently used results are evicted once the cache grows past this size
+RESULT_CACHE_MAX_BYTES = int(float(os.getenv("RESULT_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+RESULT_FILE = "result.json"
+CHUNK_SIZE = 1024 * 1024
+
+# Content hashes per (path, size, mtime), so a clip is hashed once per process
+_FILE_HASHES = {}
+
+def file_hash(path):
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _FILE_HASHES:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        _FILE_HASHES[memo_key] = digest.hexdigest()
+    return _FILE_HASHES[memo_key]
+
+def cache_key(video_path, modules=None, weights=DEFAULT_WEIGHTS, **options):
+    """Key of a detection result: video content, rules, model weights and thresholds.
+
+    Only options that change what is detected or written are part of the
+    key; batch size, pipelining and segment workers only change how fast it
+    runs. Model and snapshot settings not given in `options` are this
+    process's defaults, as pinned on the job at submission.
+    """
+    modules = sorted(modules or RULES)
+    options = with_run_defaults(options)
+    params = {
+        "video": file_hash(video_path),
+        "modules": {name: RULES[name].conf_threshold for name in modules},
+        # Weights that are not on disk yet (ultralytics downloads them) are keyed by name
+        "weights": file_hash(weights) if os.path.exists(weights) else weights,
+        # Exported and quantized models detect slightly differently from the PyTorch one
+        "backend": [options["backend"], options["int8"]],
+        "snapshot": [options["snapshot_format"], options["snapshot_quality"], options["snapshot_crop_margin"]],
+        "conf_threshold": CONF_THRESHOLD,
+        "motion_threshold": options.get("motion_threshold", DEFAULT_MOTION_THRESHOLD),
+        "min_stride": options.get("min_stride", DEFAULT_MIN_STRIDE),
+        "track": options.get("track", DEFAULT_TRACKING),
+        "max_snapshots": options.get("max_snapshots", MAX_SNAPSHOTS),
+        "start_frame": options.get("start_frame", 0),
+        "end_frame": options.get("end_frame"),
+        "output_mode": options.get("output_mode", DEFAULT_OUTPUT_MODE),
+        "output_stride": options.get("output_stride", DEFAULT_OUTPUT_STRIDE),
+        # The camera's zones rather than its name, so editing them invalidates old results
+        "camera": camera_config(options["camera"]) if options.get("camera") else None,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+# ---------------- Lookup / store ---------------- #
+
+def lookup(key, cache_dir=RESULT_CACHE_DIR):
+    """The cached result for `key`, or None on a miss or when its files are gone."""
+    entry = os.path.join(cache_dir, key)
+    try:
+        with open(os.path.join(entry, RESULT_FILE)) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    paths = [path for outputs in result["outputs"].values() for path in [outputs["output"], *outputs["snapshots"]]]
+    if not all(os.path.exists(path) for path in paths if path):
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+    os.utime(entry)  # Mark as recently used
+    result["cached"] = True
+    return result
+
+def store(key, result, cache_dir=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES):
+    """Copy a run's annotated videos and snapshots into the cache with its stats and rows."""
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f"{key}.", dir=cache_dir)
+    try:
+        outputs = {}
+        for name, run in result["outputs"].items():
+            os.makedirs(os.path.join(staging, name))
+            video = None
+            if run["output"]:
+                video = os.path.join(cache_dir, key, f"{name}_output.mp4")
+                shutil.copyfile(run["output"], os.path.join(staging, os.path.basename(video)))
+            snapshots = []
+            for path in run["snapshots"]:
+                shutil.copyfile(path, os.path.join(staging, name, os.path.basename(path)))
+                snapshots.append(os.path.join(cache_dir, key, name, os.path.basename(path)))
+            outputs[name] = {"output": video, "snapshots": snapshots, "frames": run["frames"]}
+
+        with open(os.path.join(staging, RESULT_FILE), "w") as f:
+            json.dump({"outputs": outputs, "stats": result["stats"], "violations": result.get("violations", []),
+                       "created_at": time.time()}, f)
+
+        entry = os.path.join(cache_dir, key)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.rename(staging, entry)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    evict(cache_dir, max_bytes)
+
+def _entry_size(entry):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(entry) for name in names)
+
+def evict(cache_dir=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES):
+    """Remove least recently used entries until the cache fits in `max_bytes`."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if os.path.exists(os.path.join(entry, RESULT_FILE)):
+            entries.append((os.path.getmtime(entry), _entry_size(entry), entry))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        print(f"[INFO] Evicted cached result {os.path.basename(entry)}")
+
+def clear(cache_dir=RESULT_CACHE_DIR):
+    shutil.rmtree(cache_dir, ignore_errors=True)
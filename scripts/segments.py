@@ -0,0 +1,200 @@
+import os
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+
+import cv2
+
+from scripts.backends import DEFAULT_BACKEND, DEFAULT_INT8
+from scripts.engine import DEFAULT_TRACKING, MAX_SNAPSHOTS, RULES, load_model, run_engine, with_alerts
+from scripts.violation_db import ViolationSink
+
+# Processes per job; 0 uses every core, 1 keeps the single-process engine
+DEFAULT_SEGMENT_WORKERS = int(os.getenv("DETECTION_SEGMENT_WORKERS", "1"))
+# Shorter segments are not worth the extra model load and seek
+MIN_SEGMENT_FRAMES = 300
+# Seconds between progress reports / cancel checks while segments run
+PROGRESS_INTERVAL = 0.5
+
+def default_workers():
+    return max(1, os.cpu_count() or 1)
+
+def split_ranges(total_frames, workers):
+    """Split [0, total_frames) into at most `workers` contiguous (start, end) ranges."""
+    if total_frames <= 0:
+        return [(0, None)]
+    count = max(1, min(workers, total_frames // MIN_SEGMENT_FRAMES))
+    step = -(-total_frames // count)
+    return [(start, min(start + step, total_frames)) for start in range(0, total_frames, step)]
+
+# ---------------- Worker processes ---------------- #
+
+# Shared with the parent: frames done per segment and the cancel flag. They are
+# inherited at process start, since shared memory cannot be pickled with a task.
+_frames_done = None
+_cancel_flag = None
+
+def _init_worker(threads, frames_done=None, cancel_flag=None, backend=DEFAULT_BACKEND, int8=DEFAULT_INT8):
+    global _frames_done, _cancel_flag
+    _frames_done = frames_done
+    _cancel_flag = cancel_flag
+    try:
+        import torch
+        torch.set_num_threads(threads)  # Keep workers from oversubscribing the cores
+    except ImportError:
+        pass
+    load_model(backend=backend, int8=int8)
+
+def _run_segment(index, output_dir, video_path, modules, start_frame, end_frame, options):
+    def progress(frames):
+        _frames_done[index] = frames
+
+    rows = []
+    result = run_engine(
+        video_path, modules, start_frame=start_frame, end_frame=end_frame,
+        output_dir=output_dir,
+        video_frames=True,
+        progress=progress if _frames_done is not None else None,
+        cancel=(lambda: bool(_cancel_flag.value)) if _cancel_flag is not None else None,
+        log=lambda *row, **meta: rows.append((row, meta)),
+        alert=False,  # Alerts go out from the parent, for the rows that survive the merge
+        **options
+    )
+    result["rows"] = rows
+    return result
+
+# ---------------- Merge ---------------- #
+
+def _concat_videos(paths, frame_lists, out_path, last_frame=None):
+    """Append the segment videos into one file, up to and including source frame `last_frame`.
+
+    `frame_lists` holds the source frame numbers each segment video contains,
+    which in the sparse output modes are not one per source frame.
+    """
+    writer = None
+    for path, frame_nums in zip(paths, frame_lists):
+        count = len(frame_nums) if last_frame is None else sum(1 for n in frame_nums if n <= last_frame)
+        if not count:
+            continue  # Sparse modes can leave a segment's video empty
+        cap = cv2.VideoCapture(path)
+        for _ in range(count):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if writer is None:
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(out_path, fourcc, cap.get(cv2.CAP_PROP_FPS), (width, height))
+            writer.write(frame)
+        cap.release()
+    if writer is not None:
+        writer.release()
+
+def _merge(modules, segment_results, max_snapshots, sink, output_dir="output"):
+    outputs = {}
+    for name in modules:
+        rows, snapshots, frames = [], [], []
+        for result in segment_results:
+            segment = result["outputs"][name]
+            rows.extend(row for row in result["rows"] if row[0][0] == RULES[name].label)
+            snapshots.extend(segment["snapshots"])
+            frames.extend(segment["frames"])
+
+        # Apply the snapshot cap across the whole video, as a single run would
+        for path in snapshots[max_snapshots:] if max_snapshots else []:
+            if os.path.exists(path):
+                os.remove(path)
+        snapshots, frames = snapshots[:max_snapshots], frames[:max_snapshots]
+        # Keep the rows of the snapshots that survived the cap, in snapshot order
+        order = {path: index for index, path in enumerate(snapshots)}
+        for row, meta in sorted((entry for entry in rows if entry[0][2] in order),
+                                key=lambda entry: order[entry[0][2]]):
+            sink(*row, **meta)
+
+        out_path = None
+        segment_videos = [result["outputs"][name]["output"] for result in segment_results]
+        if all(segment_videos):
+            out_path = os.path.join(output_dir, f"{name}_output.mp4")
+            last_frame = frames[-1] if max_snapshots and len(frames) >= max_snapshots else None
+            frame_lists = [result["outputs"][name]["video_frames"] for result in segment_results]
+            _concat_videos(segment_videos, frame_lists, out_path, last_frame)
+        outputs[name] = {"output": out_path, "snapshots": snapshots, "frames": frames}
+    return outputs
+
+# ---------------- Entry point ---------------- #
+
+def run_segmented(video_path, modules=None, workers=None, progress=None, cancel=None, **options):
+    """Run the engine over frame ranges of `video_path` in parallel processes.
+
+    Each process seeks to its range and loads its own model. Snapshots keep
+    their absolute frame numbers; violation rows and annotated videos are
+    merged back in frame order once every segment has finished. `workers`
+    of None or 0 uses one process per available core. With tracking, a
+    vehicle that crosses a segment boundary is reported once per segment.
+
+    `progress` is called with the frames done across all segments, every
+    PROGRESS_INTERVAL seconds. When `cancel` returns true, running segments
+    stop early and segments not started yet are dropped; the merged result
+    then covers what was processed and its stats are marked `cancelled`.
+    """
+    modules = modules or list(RULES)
+    if not workers or workers < 1:
+        workers = default_workers()
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception("Unable to open video file")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    ranges = split_ranges(total_frames, workers)
+    if len(ranges) < 2:
+        return run_engine(video_path, modules, progress=progress, cancel=cancel, **options)
+
+    # The last range reads to the end in case the container under-reports its frame count
+    ranges[-1] = (ranges[-1][0], None)
+    print(f"[INFO] Processing {len(ranges)} segments of ~{ranges[0][1]} frames on {len(ranges)} workers...")
+
+    output_dir = options.pop("output_dir", "output")
+    alert = options.pop("alert", None)
+    os.makedirs(output_dir, exist_ok=True)
+    segments_dir = tempfile.mkdtemp(prefix="segments_", dir=output_dir)
+    threads = max(1, default_workers() // len(ranges))
+    model = (options.get("backend", DEFAULT_BACKEND), options.get("int8", DEFAULT_INT8))
+    context = multiprocessing.get_context("spawn")
+    frames_done = context.Array("q", len(ranges))
+    cancel_flag = context.Value("b", 0)
+    cancelled = False
+    try:
+        with ProcessPoolExecutor(len(ranges), mp_context=context, initializer=_init_worker,
+                                 initargs=(threads, frames_done, cancel_flag, *model)) as pool:
+            futures = [pool.submit(_run_segment, index, os.path.join(segments_dir, str(index)),
+                                   video_path, modules, start, end, options)
+                       for index, (start, end) in enumerate(ranges)]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, PROGRESS_INTERVAL, FIRST_EXCEPTION)
+                if progress:
+                    progress(sum(frames_done))
+                if not cancelled and cancel and cancel():
+                    cancelled = True
+                    cancel_flag.value = 1
+                    for future in pending:
+                        future.cancel()
+                if any(future.done() and not future.cancelled() and future.exception() for future in futures):
+                    cancel_flag.value = 1  # Stop the other segments; the error is raised below
+                    break
+            segment_results = [future.result() for future in futures if not future.cancelled()]
+        max_snapshots = None if options.get("track", DEFAULT_TRACKING) else options.get("max_snapshots", MAX_SNAPSHOTS)
+        with ViolationSink() as sink:
+            outputs = _merge(modules, segment_results, max_snapshots, with_alerts(sink, alert), output_dir)
+    finally:
+        shutil.rmtree(segments_dir, ignore_errors=True)
+
+    stats = {"segments": [result["stats"] for result in segment_results]}
+    for key in ("frames", "inferred", "skipped"):
+        stats[key] = sum(result["stats"][key] for result in segment_results)
+    if cancelled:
+        stats["cancelled"] = True
+    return {"outputs": outputs, "stats": stats}
@@ -1,19 +1,12 @@
-import sqlite3
+import os
+import sys
 
-# Connect (or create) a database file
-conn = sqlite3.connect("data/violations.db")
-cursor = conn.cursor()
+# Runnable as a file (`python scripts/setup_db.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Create table if it doesn't exist
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS helmet_violations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    timestamp TEXT,
-    video_name TEXT,
-    image_path TEXT
-)
-""")
+from scripts.violation_db import DB_PATH, migrate
 
-conn.commit()
-conn.close()
-print("✅ Database and table created successfully.")
\ No newline at end of file
+# Create or upgrade the shared violations store; helmet violations now live
+# in its `violations` table alongside every other type
+migrate()
+print(f"✅ Database and table created successfully at '{DB_PATH}'.")
\ No newline at end of file
@@ -0,0 +1,122 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from scripts import metrics
+from scripts.thumbnails import thumbnail_path, write_thumbnail
+
+# "jpg" or "webp"
+SNAPSHOT_FORMAT = os.getenv("SNAPSHOT_FORMAT", "jpg").lower()
+SNAPSHOT_QUALITY = int(os.getenv("SNAPSHOT_QUALITY", "95"))
+# Crop snapshots to the violating box(es) plus this many pixels; 0 keeps the full frame
+SNAPSHOT_CROP_MARGIN = int(os.getenv("SNAPSHOT_CROP_MARGIN", "0"))
+SNAPSHOT_WRITERS = int(os.getenv("SNAPSHOT_WRITERS", "2"))
+# Frames waiting to be encoded; a full queue makes the detection loop wait
+MAX_PENDING_SNAPSHOTS = 32
+
+SNAPSHOT_EXTENSIONS = (".jpg", ".webp")
+_QUALITY_FLAGS = {"jpg": cv2.IMWRITE_JPEG_QUALITY, "webp": cv2.IMWRITE_WEBP_QUALITY}
+
+def crop_to_box(frame, box, margin):
+    """The part of `frame` inside x1, y1, x2, y2 `box` grown by `margin` pixels."""
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = (int(v) for v in box[:4])
+    return frame[max(0, y1 - margin):min(height, y2 + margin), max(0, x1 - margin):min(width, x2 + margin)]
+
+def encode_snapshot(path, frame, box=None, fmt=SNAPSHOT_FORMAT, quality=SNAPSHOT_QUALITY,
+                    crop_margin=SNAPSHOT_CROP_MARGIN):
+    """Encode and write one snapshot plus its thumbnail; returns the written image's (width, height)."""
+    image = crop_to_box(frame, box, crop_margin) if crop_margin and box is not None else frame
+    ok, data = cv2.imencode(f".{fmt}", image, [_QUALITY_FLAGS[fmt], quality])
+    if not ok:
+        raise Exception(f"Could not encode snapshot {path}")
+    with open(path, "wb") as f:
+        f.write(data.tobytes())
+    write_thumbnail(path, image)
+    height, width = image.shape[:2]
+    return width, height
+
+class SnapshotWriter:
+    """Encodes and writes snapshots on a thread pool, off the detection loop.
+
+    `submit` hands over a frame and a callback. Encoding runs in parallel,
+    but the callbacks run one at a time on a single thread in submission
+    order, once each file is on disk, so violations are logged in frame
+    order and only for snapshots that were actually written. A failed write
+    is reported and skipped. If the callback fails, the file is removed
+    again, so no snapshot is left on disk without its violation row.
+    """
+
+    def __init__(self, workers=SNAPSHOT_WRITERS, fmt=SNAPSHOT_FORMAT, quality=SNAPSHOT_QUALITY,
+                 crop_margin=SNAPSHOT_CROP_MARGIN):
+        if fmt not in _QUALITY_FLAGS:
+            raise Exception(f"Unsupported snapshot format: {fmt}")
+        self.extension = f".{fmt}"
+        self.options = {"fmt": fmt, "quality": quality, "crop_margin": crop_margin}
+        self.pool = ThreadPoolExecutor(max(1, workers), thread_name_prefix="snapshot")
+        self.pending = threading.BoundedSemaphore(MAX_PENDING_SNAPSHOTS)
+        self.lock = threading.Lock()
+        self.failed = 0    # Snapshots that could not be written
+        self.unlogged = 0  # Snapshots written but whose callback failed
+        self.queued = 0    # Submitted but not yet written and logged
+        self.busy_seconds = 0.0  # Encode + write time summed over the pool's threads
+        self.completions = queue.Queue()
+        self._completer = threading.Thread(target=self._complete, name="snapshot-log", daemon=True)
+        self._completer.start()
+
+    def submit(self, path, frame, on_written, box=None):
+        self.pending.acquire()
+        with self.lock:
+            self.queued += 1
+        self.completions.put((path, self.pool.submit(self._write, path, frame, box), on_written))
+
+    def _write(self, path, frame, box):
+        started = time.perf_counter()
+        size = encode_snapshot(path, frame, box, **self.options)
+        seconds = time.perf_counter() - started
+        with self.lock:
+            self.busy_seconds += seconds
+        metrics.observe("snapshot_write_seconds", seconds)
+        return size
+
+    def _complete(self):
+        while True:
+            item = self.completions.get()
+            if item is None:
+                return
+            path, future, on_written = item
+            try:
+                self._finish(path, future, on_written)
+            finally:
+                with self.lock:
+                    self.queued -= 1
+                self.pending.release()
+
+    def _finish(self, path, future, on_written):
+        try:
+            size = future.result()
+        except Exception as e:
+            with self.lock:
+                self.failed += 1
+            metrics.inc("snapshot_failures_total")
+            print(f"[ERROR] Snapshot {path} not saved: {e}")
+            return
+        try:
+            on_written(*size)
+        except Exception as e:
+            with self.lock:
+                self.unlogged += 1
+            print(f"[ERROR] Snapshot {path} saved but its violation could not be logged: {e}")
+            for orphan in (path, thumbnail_path(path)):
+                if os.path.exists(orphan):
+                    os.remove(orphan)
+
+    def close(self):
+        """Wait for every submitted snapshot to be written and logged."""
+        self.completions.put(None)
+        self._completer.join()
+        self.pool.shutdown(wait=True)
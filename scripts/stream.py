@@ -0,0 +1,184 @@
+import sys
+import os
+import time
+import argparse
+import threading
+from collections import deque
+
+import cv2
+
+# Runnable as a file (`python scripts/stream.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import metrics
+from scripts.engine import RULES, process_frames
+from scripts.violation_db import create_violations_table
+
+DEFAULT_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "4"))
+# Frames older than this (seconds since capture) are dropped instead of inferred
+DEFAULT_MAX_LATENCY = float(os.getenv("STREAM_MAX_LATENCY", "1.0"))
+FALLBACK_FPS = 25.0
+
+class RingBuffer:
+    """Fixed-size frame buffer between the capture thread and the engine.
+
+    When the buffer is full the oldest frame is overwritten, so a slow
+    consumer loses frames instead of building up an ever-growing backlog.
+    """
+
+    def __init__(self, capacity=DEFAULT_BUFFER_SIZE):
+        self.frames = deque(maxlen=capacity)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.overwritten = 0
+
+    def put(self, item):
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.overwritten += 1
+                metrics.inc("frames_dropped_total", reason="overwritten")
+            self.frames.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Oldest buffered item, or None once the buffer is closed and empty."""
+        with self.condition:
+            while not self.frames and not self.closed:
+                if not self.condition.wait(timeout):
+                    return None
+            return self.frames.popleft() if self.frames else None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+def open_source(source):
+    """Open a device index ("0"), an RTSP/HTTP URL or a file path."""
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not cap.isOpened():
+        raise Exception(f"Unable to open stream source: {source}")
+    return cap
+
+class LiveIngest:
+    """Captures frames from a live source on a background thread into a RingBuffer.
+
+    With `replay`, a video file is played back at its native FPS so it can
+    stand in for a camera during local testing.
+    """
+
+    def __init__(self, source, buffer_size=DEFAULT_BUFFER_SIZE, max_latency=DEFAULT_MAX_LATENCY, replay=False):
+        self.source = source
+        self.cap = open_source(source)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or FALLBACK_FPS
+        self.size = (int(self.cap.get(3)), int(self.cap.get(4)))
+        self.replay = replay
+        self.max_latency = max_latency
+        self.buffer = RingBuffer(buffer_size)
+        self.stop_event = threading.Event()
+        self.captured = 0
+        self.stale = 0
+        self._thread = threading.Thread(target=self._capture, name="capture", daemon=True)
+
+    def _capture(self):
+        interval = 1.0 / self.fps
+        next_due = time.monotonic()
+        while not self.stop_event.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            if self.replay:
+                next_due += interval
+                time.sleep(max(0.0, next_due - time.monotonic()))
+            self.buffer.put((self.captured, time.monotonic(), frame))
+            self.captured += 1
+        self.buffer.close()
+
+    def frames(self):
+        """Yield (frame_num, frame) for frames still within the latency deadline."""
+        self._thread.start()
+        try:
+            while not self.stop_event.is_set():
+                item = self.buffer.get(timeout=0.5)
+                if item is None:
+                    if self.buffer.closed:
+                        break
+                    continue
+                frame_num, captured_at, frame = item
+                if time.monotonic() - captured_at > self.max_latency:
+                    self.stale += 1
+                    metrics.inc("frames_dropped_total", reason="stale")
+                    continue
+                yield frame_num, frame
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stop_event.set()
+        self.buffer.close()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.cap.release()
+
+    def stats(self):
+        return {
+            "captured": self.captured,
+            "dropped_overwritten": self.buffer.overwritten,
+            "dropped_stale": self.stale,
+        }
+
+def run_stream(source, modules=None, duration=None, replay=False, buffer_size=DEFAULT_BUFFER_SIZE,
+               max_latency=DEFAULT_MAX_LATENCY, **options):
+    """Run the engine continuously on a live source until it ends, `duration` passes or Ctrl+C.
+
+    There is no snapshot cap in live mode. Frames wait in a fixed-size ring
+    buffer; when inference falls behind they are overwritten there, or
+    dropped once they are older than `max_latency` seconds.
+    """
+    ingest = LiveIngest(source, buffer_size, max_latency, replay)
+    if duration:
+        timer = threading.Timer(duration, ingest.stop_event.set)
+        timer.daemon = True
+        timer.start()
+
+    options.setdefault("max_snapshots", None)
+    options.setdefault("queue_size", 1)  # The ring buffer already absorbs bursts
+    print(f"[INFO] Ingesting {source} at {ingest.fps:.1f} FPS "
+          f"(buffer {buffer_size} frames, max latency {max_latency}s)...")
+    try:
+        result = process_frames(ingest.frames(), source, ingest.fps, ingest.size, modules, **options)
+    finally:
+        ingest.stop()
+
+    result["stats"].update(ingest.stats())
+    stats = result["stats"]
+    print(f"[INFO] Captured {stats['captured']} frames: {stats['dropped_overwritten']} overwritten in the "
+          f"buffer, {stats['dropped_stale']} dropped as stale.")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run violation rules on a live camera or stream.")
+    parser.add_argument("source", help="device index, rtsp:// or http(s):// URL, or a video file with --replay")
+    parser.add_argument("modules", nargs="*", metavar="module",
+                        help=f"rules to apply ({', '.join(RULES)}); all when omitted")
+    parser.add_argument("--replay", action="store_true",
+                        help="play a video file back at its native FPS as a stand-in camera")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--buffer-size", type=int, default=DEFAULT_BUFFER_SIZE)
+    parser.add_argument("--max-latency", type=float, default=DEFAULT_MAX_LATENCY)
+    parser.add_argument("--camera", help="camera whose zones (see config/cameras.example.json) apply")
+    parser.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT,
+                        help="serve Prometheus metrics on this port (0 disables)")
+    args = parser.parse_args()
+    create_violations_table()
+    if args.metrics_port:
+        metrics.serve_metrics(args.metrics_port)
+
+    try:
+        run_stream(args.source, args.modules or None, args.duration, args.replay,
+                   args.buffer_size, args.max_latency, camera=args.camera)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        sys.exit(1)
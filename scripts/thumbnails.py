@@ -0,0 +1,48 @@
+import os
+import cv2
+
+THUMBNAIL_DIR = "cache/thumbnails"
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_QUALITY = 80
+
+def thumbnail_path(image_path):
+    """Cache location of the thumbnail for `image_path`, mirroring its directory layout."""
+    relative = os.path.relpath(os.path.abspath(image_path), os.getcwd())
+    if relative.startswith(".."):
+        relative = os.path.abspath(image_path).lstrip(os.sep)
+    return os.path.join(THUMBNAIL_DIR, os.path.splitext(relative)[0] + ".jpg")
+
+def write_thumbnail(image_path, image, width=THUMBNAIL_WIDTH):
+    """Downscale an already-decoded image and store it as the thumbnail of `image_path`."""
+    height, src_width = image.shape[:2]
+    if src_width > width:
+        image = cv2.resize(image, (width, max(1, height * width // src_width)), interpolation=cv2.INTER_AREA)
+    path = thumbnail_path(image_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+    return path
+
+def get_thumbnail(image_path, width=THUMBNAIL_WIDTH):
+    """Path of a cached thumbnail for `image_path`, creating it when missing or stale.
+
+    A thumbnail is stale when the source image was modified after it.
+    Returns None when the source image does not exist or cannot be read.
+    """
+    try:
+        source_mtime = os.path.getmtime(image_path)
+    except OSError:
+        return None
+
+    path = thumbnail_path(image_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= source_mtime:
+        return path
+
+    # Let the JPEG decoder downscale while decoding instead of reading full resolution
+    image = cv2.imread(image_path, cv2.IMREAD_REDUCED_COLOR_2)
+    if image is None:
+        return None
+    return write_thumbnail(image_path, image, width)
+
+def clear_thumbnails():
+    import shutil
+    shutil.rmtree(THUMBNAIL_DIR, ignore_errors=True)
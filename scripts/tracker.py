@@ -0,0 +1,97 @@
+import numpy as np
+
+from scripts.boxes import iou_matrix
+
+class Track:
+    """One tracked object with a constant-velocity motion model."""
+
+    def __init__(self, track_id, box, cls):
+        self.id = track_id
+        self.box = box
+        self.cls = cls
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.misses = 0
+
+    def predict(self):
+        return self.box + self.velocity * (self.misses + 1)
+
+    def update(self, box):
+        # Smooth the velocity so one jittery box doesn't throw the prediction off
+        step = (box - self.box) / (self.misses + 1)
+        self.velocity = 0.5 * self.velocity + 0.5 * step
+        self.box = box
+        self.misses = 0
+
+class Tracker:
+    """Lightweight ByteTrack-style IoU tracker that gives each vehicle a stable ID.
+
+    Detections are matched to the predicted boxes of existing tracks in two
+    rounds: confident detections first, then low-confidence ones, which keeps
+    a track alive through a few poorly detected frames. Confident detections
+    left over start new tracks; tracks unmatched for more than `max_age`
+    updates are finished.
+    """
+
+    def __init__(self, high_thresh=0.5, low_thresh=0.1, iou_thresh=0.3, max_age=30):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.iou_thresh = iou_thresh
+        self.max_age = max_age
+        self.tracks = {}
+        self.next_id = 1
+
+    def update(self, dets):
+        """Match an (N, 6) detection array to tracks.
+
+        Returns (ids, finished): the track ID for each detection (-1 when a
+        low-confidence detection matched nothing) and the IDs of tracks that
+        ended on this update.
+        """
+        ids = np.full(len(dets), -1, dtype=np.int64)
+        boxes = dets[:, :4].astype(np.float32)
+        conf = dets[:, 4]
+        cls = dets[:, 5].astype(np.int64)
+
+        tracks = list(self.tracks.values())
+        remaining = np.arange(len(tracks))
+        high = np.flatnonzero(conf >= self.high_thresh)
+        low = np.flatnonzero((conf >= self.low_thresh) & (conf < self.high_thresh))
+
+        for candidates in (high, low):
+            if not len(remaining) or not len(candidates):
+                continue
+            predicted = np.array([tracks[i].predict() for i in remaining], dtype=np.float32)
+            iou = iou_matrix(predicted, boxes[candidates])
+            iou[np.array([tracks[i].cls for i in remaining])[:, None] != cls[candidates][None, :]] = 0
+            matched = set()
+            while True:
+                t, d = np.unravel_index(np.argmax(iou), iou.shape)
+                if iou[t, d] < self.iou_thresh:
+                    break
+                track = tracks[remaining[t]]
+                track.update(boxes[candidates[d]])
+                ids[candidates[d]] = track.id
+                matched.add(t)
+                iou[t, :] = 0
+                iou[:, d] = 0
+            remaining = np.array([i for j, i in enumerate(remaining) if j not in matched], dtype=np.int64)
+
+        for d in high[ids[high] == -1]:
+            self.tracks[self.next_id] = Track(self.next_id, boxes[d], cls[d])
+            ids[d] = self.next_id
+            self.next_id += 1
+
+        finished = []
+        for i in remaining:
+            track = tracks[i]
+            track.misses += 1
+            if track.misses > self.max_age:
+                finished.append(track.id)
+                del self.tracks[track.id]
+        return ids, finished
+
+    def flush(self):
+        """Finish every live track, e.g. at the end of a video."""
+        finished = list(self.tracks)
+        self.tracks.clear()
+        return finished
@@ -1,9 +1,17 @@
+import os
+import sys
 import sqlite3
 
-conn = sqlite3.connect("data/violations.db")
+# Runnable as a file (`python scripts/view_logs.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.violation_db import DB_PATH, migrate
+
+migrate()
+conn = sqlite3.connect(DB_PATH)
 cursor = conn.cursor()
 
-cursor.execute("SELECT * FROM helmet_violations")
+cursor.execute("SELECT * FROM violations ORDER BY id")
 rows = cursor.fetchall()
 
 print("\n📄 Logged Violations:")
@@ -0,0 +1,654 @@
+import sys
+import os
+import re
+import time
+import atexit
+import signal
+import sqlite3
+import threading
+
+from scripts import metrics
+
+# The single violations store shared by the detectors and the Streamlit app
+DB_PATH = "data/violations.db"
+# Older stores whose rows are imported into DB_PATH by the migrations below
+LEGACY_DB_PATHS = ["violations.db", "database/violations.db", "scripts/data/violations.db"]
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 2.0
+
+# ---------------- Migrations ---------------- #
+
+def _create_violations(conn, db_path):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS violations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT,
+            timestamp TEXT,
+            image_path TEXT,
+            video TEXT
+        )
+    """)
+    # Tables created by the old ensure_violations_table lack the video column
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(violations)")]
+    if "video" not in columns:
+        conn.execute("ALTER TABLE violations ADD COLUMN video TEXT")
+
+def _create_indexes(conn, db_path):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_type_timestamp ON violations (type, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations (timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_video_timestamp ON violations (video, timestamp)")
+
+def _import_legacy(conn, db_path):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS legacy_imports (
+            source TEXT PRIMARY KEY,
+            rows INTEGER,
+            imported_at TEXT
+        )
+    """)
+
+    # scripts/setup_db.py kept helmet violations in their own table
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    if "helmet_violations" in tables:
+        conn.execute("""
+            INSERT INTO violations (type, timestamp, image_path, video)
+            SELECT 'Helmet Violation', timestamp, image_path, video_name FROM helmet_violations ORDER BY id
+        """)
+        conn.execute("DROP TABLE helmet_violations")
+
+    # The legacy files are the predecessors of the shared store only; other stores
+    # (tests, benchmarks, scratch copies) must not receive their rows
+    if os.path.abspath(db_path) == os.path.abspath(DB_PATH):
+        for path in LEGACY_DB_PATHS:
+            import_legacy_db(conn, path, db_path)
+
+def _create_rollups(conn, db_path):
+    # Counts per type x day x source video, per type x hour, and per type.
+    # Triggers keep them current on every insert/delete, so the statistics
+    # dashboard never has to scan the raw violations table.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS violation_daily_rollup (
+            type TEXT NOT NULL,
+            day TEXT NOT NULL,
+            video TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (type, day, video)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_daily_rollup_day ON violation_daily_rollup (day)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS violation_hourly_rollup (
+            type TEXT NOT NULL,
+            hour TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (type, hour)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hourly_rollup_hour ON violation_hourly_rollup (hour)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS violation_type_totals (
+            type TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        )
+    """)
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_violations_rollup_insert AFTER INSERT ON violations
+        BEGIN
+            INSERT INTO violation_daily_rollup (type, day, video, count)
+            VALUES (IFNULL(new.type, ''), IFNULL(substr(new.timestamp, 1, 10), ''), IFNULL(new.video, ''), 1)
+            ON CONFLICT (type, day, video) DO UPDATE SET count = count + 1;
+            INSERT INTO violation_hourly_rollup (type, hour, count)
+            VALUES (IFNULL(new.type, ''), IFNULL(substr(new.timestamp, 1, 13), ''), 1)
+            ON CONFLICT (type, hour) DO UPDATE SET count = count + 1;
+            INSERT INTO violation_type_totals (type, count)
+            VALUES (IFNULL(new.type, ''), 1)
+            ON CONFLICT (type) DO UPDATE SET count = count + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_violations_rollup_delete AFTER DELETE ON violations
+        BEGIN
+            UPDATE violation_daily_rollup SET count = count - 1
+            WHERE type = IFNULL(old.type, '') AND day = IFNULL(substr(old.timestamp, 1, 10), '')
+              AND video = IFNULL(old.video, '');
+            UPDATE violation_hourly_rollup SET count = count - 1
+            WHERE type = IFNULL(old.type, '') AND hour = IFNULL(substr(old.timestamp, 1, 13), '');
+            UPDATE violation_type_totals SET count = count - 1 WHERE type = IFNULL(old.type, '');
+        END
+    """)
+
+    # Backfill from the rows logged before the rollups existed
+    conn.execute("DELETE FROM violation_daily_rollup")
+    conn.execute("DELETE FROM violation_hourly_rollup")
+    conn.execute("DELETE FROM violation_type_totals")
+    conn.execute("""
+        INSERT INTO violation_daily_rollup (type, day, video, count)
+        SELECT IFNULL(type, ''), IFNULL(substr(timestamp, 1, 10), ''), IFNULL(video, ''), COUNT(*)
+        FROM violations GROUP BY 1, 2, 3
+    """)
+    conn.execute("""
+        INSERT INTO violation_hourly_rollup (type, hour, count)
+        SELECT IFNULL(type, ''), IFNULL(substr(timestamp, 1, 13), ''), COUNT(*)
+        FROM violations GROUP BY 1, 2
+    """)
+    conn.execute("""
+        INSERT INTO violation_type_totals (type, count)
+        SELECT IFNULL(type, ''), COUNT(*) FROM violations GROUP BY 1
+    """)
+
+def _create_snapshot_manifest(conn, db_path):
+    # One row per snapshot written, recorded at capture time, so listings and
+    # cleanup never have to walk the snapshots/ tree
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL UNIQUE,
+            category TEXT NOT NULL,
+            date TEXT NOT NULL,
+            frame_num INTEGER,
+            video TEXT,
+            width INTEGER,
+            height INTEGER,
+            created_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_category_date ON snapshots (category, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_video ON snapshots (video)")
+    reindex_snapshots(conn)
+
+def _index_image_paths(conn, db_path):
+    # Cached detection results look their violation rows up by snapshot path
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_image_path ON violations (image_path)")
+
+def _create_jobs(conn, db_path):
+    # Background detection jobs; the dashboard polls these rows for progress
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_path TEXT NOT NULL,
+            modules TEXT NOT NULL,
+            options TEXT NOT NULL,
+            submitted_by TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            total_frames INTEGER,
+            frames_done INTEGER NOT NULL DEFAULT 0,
+            fps REAL,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            result TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            updated_at REAL,
+            finished_at REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_submitted_by ON jobs (submitted_by, id)")
+
+def _index_sort_columns(conn, db_path):
+    # Keyset pages sorted by type or video need (column, id) order; the (column, timestamp)
+    # indexes would leave SQLite sorting the whole tail of the table for every page
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_type ON violations (type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_video ON violations (video)")
+
+def _create_uploads(conn, db_path):
+    # Uploads are stored under their SHA-256 (see upload_utils.store_upload), which is also
+    # what ends up in violations.video; keep the name they were uploaded as, for display
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS uploads (
+            hash TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            uploaded_at TEXT
+        )
+    """)
+
+# (version, migration) pairs; append new ones, never edit an applied one. Each migration
+# gets the connection and the path of the store being migrated
+MIGRATIONS = [
+    (1, _create_violations),
+    (2, _create_indexes),
+    (3, _import_legacy),
+    (4, _create_rollups),
+    (5, _create_snapshot_manifest),
+    (6, _index_image_paths),
+    (7, _create_jobs),
+    (8, _index_sort_columns),
+    (9, _create_uploads),
+]
+
+def migrate(db_path=DB_PATH):
+    """Bring the store at `db_path` up to the latest schema version.
+
+    Each pending migration runs in its own transaction and bumps
+    `PRAGMA user_version`, so it is applied exactly once.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    conn.execute("ROLLBACK")
+                    continue
+                migration(conn, db_path)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+
+def import_legacy_db(conn, path, db_path):
+    """Copy the violations of an older database file into the store at `db_path`, once per file.
+
+    Handles both legacy layouts (`image_path` or `snapshot` column). Returns
+    the number of rows imported.
+    """
+    source = os.path.normpath(path)
+    if not os.path.exists(path) or os.path.abspath(path) == os.path.abspath(db_path):
+        return 0
+    if conn.execute("SELECT 1 FROM legacy_imports WHERE source = ?", (source,)).fetchone():
+        return 0
+
+    legacy = sqlite3.connect(path)
+    try:
+        columns = [col[1] for col in legacy.execute("PRAGMA table_info(violations)")]
+        if not columns:
+            rows = 0
+        else:
+            image_col = "image_path" if "image_path" in columns else "snapshot" if "snapshot" in columns else "NULL"
+            video_col = "video" if "video" in columns else "NULL"
+            cursor = legacy.execute(f"SELECT type, timestamp, {image_col}, {video_col} FROM violations ORDER BY id")
+            rows = conn.executemany(
+                "INSERT INTO violations (type, timestamp, image_path, video) VALUES (?, ?, ?, ?)", cursor
+            ).rowcount
+    finally:
+        legacy.close()
+
+    conn.execute("INSERT INTO legacy_imports (source, rows, imported_at) VALUES (?, ?, datetime('now'))",
+                 (source, rows))
+    print(f"[INFO] Imported {rows} violations from {path}")
+    return rows
+
+# ---------------- Queries ---------------- #
+
+VIOLATION_COLUMNS = ["id", "type", "timestamp", "image_path", "video"]
+SORT_COLUMNS = ["timestamp", "type", "video", "id"]
+
+def _keyset_ranges(column, descending, after):
+    """The index ranges that follow cursor `after` in ORDER BY column, id, as (clause, params) pairs.
+
+    Every index on one column also holds the rowid, so each range below is
+    a SEARCH of (column, id): first the rest of the cursor's own value, then
+    the values past it. NULLs sort first ascending and last descending, so
+    they form a range of their own, read after or before the others.
+    """
+    op = "<" if descending else ">"
+    if after is None:
+        return [(None, [])]
+    last_value, last_id = after
+    if column == "id":
+        return [(f"id {op} ?", [last_id])]
+    if last_value is None:  # The cursor is inside the NULL range
+        rest = [] if descending else [(f"{column} IS NOT NULL", [])]
+        return [(f"{column} IS NULL AND id {op} ?", [last_id])] + rest
+    ranges = [(f"{column} = ? AND id {op} ?", [last_value, last_id]), (f"{column} {op} ?", [last_value])]
+    return ranges + ([(f"{column} IS NULL", [])] if descending else [])
+
+def query_violations(types=None, start_date=None, end_date=None, video=None, sort="timestamp",
+                     descending=True, after=None, limit=50, db_path=DB_PATH):
+    """Fetch one page of violations, filtered and sorted in SQL.
+
+    Uses keyset pagination: `after` is the (sort value, id) cursor of the
+    last row of the previous page. The page is read as a few index ranges
+    starting at that cursor (see `_keyset_ranges`), so its cost does not
+    grow with page depth. Dates are inclusive `YYYY-MM-DD` strings.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort violations by {sort}")
+
+    where, params = [], []
+    if types:
+        where.append(f"type IN ({', '.join('?' * len(types))})")
+        params.extend(types)
+    if start_date:
+        where.append("timestamp >= ?")
+        params.append(str(start_date))
+    if end_date:
+        where.append("timestamp < date(?, '+1 day')")
+        params.append(str(end_date))
+    if video:
+        where.append("video = ?")
+        params.append(video)
+
+    direction = "DESC" if descending else "ASC"
+    order = f"id {direction}" if sort == "id" else f"{sort} {direction}, id {direction}"
+    rows = []
+    conn = sqlite3.connect(db_path)
+    try:
+        for clause, values in _keyset_ranges(sort, descending, after):
+            conditions = where + ([clause] if clause else [])
+            sql = f"SELECT {', '.join(VIOLATION_COLUMNS)} FROM violations"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += f" ORDER BY {order} LIMIT ?"
+            rows += conn.execute(sql, params + values + [limit + 1 - len(rows)]).fetchall()
+            if len(rows) > limit:
+                break
+    finally:
+        conn.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last[VIOLATION_COLUMNS.index(sort)], last[0])
+    return rows, next_cursor
+
+def distinct_values(column, db_path=DB_PATH):
+    """Distinct non-null values of an indexed column (type or video), for filter widgets."""
+    if column not in ("type", "video"):
+        raise ValueError(f"No index to list distinct {column} values")
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            f"SELECT DISTINCT {column} FROM violations WHERE {column} IS NOT NULL ORDER BY {column}")]
+    finally:
+        conn.close()
+
+# ---------------- Upload names ---------------- #
+
+_UPLOAD_FILE = re.compile(r"^([0-9a-f]{64})\.\w+$")
+
+def upload_hash(video):
+    """SHA-256 of a content-addressed upload, from its stored path; None for any other video."""
+    match = _UPLOAD_FILE.match(os.path.basename(str(video)))
+    return match.group(1) if match else None
+
+def record_upload(path, name, db_path=DB_PATH):
+    """Remember `name` as the original file name of the upload stored at `path`.
+
+    The same content uploaded again under another name is shown under the
+    newer name.
+    """
+    digest = upload_hash(path)
+    if digest is None:
+        return
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute("""
+                INSERT INTO uploads (hash, name, uploaded_at) VALUES (?, ?, datetime('now'))
+                ON CONFLICT (hash) DO UPDATE SET name = excluded.name, uploaded_at = excluded.uploaded_at
+            """, (digest, name))
+    finally:
+        conn.close()
+
+def video_labels(videos, db_path=DB_PATH):
+    """Display name of each video: an upload's original file name, else the file's basename.
+
+    Empty values (no video recorded) are returned unchanged.
+    """
+    videos = set(videos)
+    digests = {video: upload_hash(video) for video in videos if video not in (None, "")}
+    wanted = sorted({digest for digest in digests.values() if digest})
+    names = {}
+    if wanted and os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            for start in range(0, len(wanted), 500):
+                chunk = wanted[start:start + 500]
+                names.update(conn.execute(
+                    f"SELECT hash, name FROM uploads WHERE hash IN ({', '.join('?' * len(chunk))})", chunk))
+        except sqlite3.OperationalError:
+            pass  # A store from before the uploads table; fall back to file names
+        finally:
+            conn.close()
+    return {video: (names.get(digests.get(video)) or os.path.basename(str(video).rstrip("/")) or str(video))
+            if video in digests else video for video in videos}
+
+def video_label(video, db_path=DB_PATH):
+    return video_labels([video], db_path)[video]
+
+def violations_for_images(image_paths, db_path=DB_PATH):
+    """Violation rows (as dicts) recorded for the given snapshot paths, in insertion order."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = []
+        # Stay under SQLite's bound-parameter limit on long runs
+        for start in range(0, len(image_paths), 500):
+            chunk = image_paths[start:start + 500]
+            rows.extend(conn.execute(
+                f"SELECT {', '.join(VIOLATION_COLUMNS)} FROM violations "
+                f"WHERE image_path IN ({', '.join('?' * len(chunk))})", chunk))
+    finally:
+        conn.close()
+    return [dict(zip(VIOLATION_COLUMNS, row)) for row in sorted(rows)]
+
+def _rollup_query(sql, params=(), db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def violation_totals(db_path=DB_PATH):
+    """[(type, count)] over all history, read from the per-type rollup."""
+    return _rollup_query("SELECT type, count FROM violation_type_totals WHERE count > 0 ORDER BY count DESC",
+                         db_path=db_path)
+
+def daily_counts(since_day, db_path=DB_PATH):
+    """[(day, type, count)] for days on or after `since_day` (YYYY-MM-DD)."""
+    return _rollup_query("""
+        SELECT day, type, SUM(count) FROM violation_daily_rollup
+        WHERE day >= ? GROUP BY day, type HAVING SUM(count) > 0 ORDER BY day
+    """, (str(since_day),), db_path)
+
+def hourly_counts(since_hour, db_path=DB_PATH):
+    """[(hour, type, count)] for hours on or after `since_hour` (YYYY-MM-DD HH)."""
+    return _rollup_query("""
+        SELECT hour, type, count FROM violation_hourly_rollup
+        WHERE hour >= ? AND count > 0 ORDER BY hour
+    """, (since_hour,), db_path)
+
+def video_counts(since_day, limit=10, db_path=DB_PATH):
+    """[(video, count)] of the source videos with the most violations since `since_day`."""
+    return _rollup_query("""
+        SELECT video, SUM(count) AS total FROM violation_daily_rollup
+        WHERE day >= ? GROUP BY video HAVING total > 0 ORDER BY total DESC LIMIT ?
+    """, (str(since_day), limit), db_path)
+
+# ---------------- Snapshot manifest ---------------- #
+
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_COLUMNS = ["path", "category", "date", "frame_num", "video", "width", "height", "created_at"]
+_FRAME_NUM = re.compile(r"_violation_(\d+)")
+
+def reindex_snapshots(conn, base_dir=SNAPSHOT_DIR):
+    """Add manifest rows for snapshots on disk that have none (one-off backfill).
+
+    Frame numbers come from the file name and the source video from the
+    matching violation row; dimensions are left empty rather than decoding
+    every image.
+    """
+    rows = []
+    for category in sorted(os.listdir(base_dir)) if os.path.isdir(base_dir) else []:
+        category_path = os.path.join(base_dir, category)
+        if not os.path.isdir(category_path):
+            continue
+        for date in sorted(os.listdir(category_path)):
+            date_path = os.path.join(category_path, date)
+            if not os.path.isdir(date_path):
+                continue
+            for name in sorted(os.listdir(date_path)):
+                if name.endswith((".jpg", ".webp")):
+                    match = _FRAME_NUM.search(name)
+                    rows.append((os.path.join(date_path, name), category, date,
+                                 int(match.group(1)) if match else None))
+    conn.executemany("""
+        INSERT OR IGNORE INTO snapshots (path, category, date, frame_num, video, created_at)
+        VALUES (?, ?, ?, ?, (SELECT video FROM violations WHERE image_path = ? LIMIT 1), datetime('now'))
+    """, [(path, category, date, frame_num, path) for path, category, date, frame_num in rows])
+    return len(rows)
+
+def _manifest_query(sql, params=(), db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def snapshot_categories(db_path=DB_PATH):
+    return [row[0] for row in _manifest_query("SELECT DISTINCT category FROM snapshots ORDER BY category",
+                                              db_path=db_path)]
+
+def snapshot_dates(category, db_path=DB_PATH):
+    return [row[0] for row in _manifest_query(
+        "SELECT DISTINCT date FROM snapshots WHERE category = ? ORDER BY date DESC", (category,), db_path)]
+
+def count_snapshots(category, date, db_path=DB_PATH):
+    return _manifest_query("SELECT COUNT(*) FROM snapshots WHERE category = ? AND date = ?",
+                           (category, date), db_path)[0][0]
+
+def list_snapshots(category=None, date=None, video=None, limit=None, offset=0, db_path=DB_PATH):
+    """Manifest rows (as dicts) matching the given category/date/video, in capture order."""
+    where, params = [], []
+    for column, value in (("category", category), ("date", date), ("video", video)):
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    sql = f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM snapshots"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+    return [dict(zip(SNAPSHOT_COLUMNS, row)) for row in _manifest_query(sql, params, db_path)]
+
+def delete_snapshot_records(paths=None, db_path=DB_PATH):
+    """Drop manifest rows for `paths`, or every row when `paths` is None."""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            if paths is None:
+                conn.execute("DELETE FROM snapshots")
+            else:
+                conn.executemany("DELETE FROM snapshots WHERE path = ?", [(path,) for path in paths])
+    finally:
+        conn.close()
+
+# ---------------- Writers ---------------- #
+
+def create_violations_table():
+    migrate()
+
+INSERT_VIOLATION = "INSERT INTO violations (type, timestamp, image_path, video) VALUES (?, ?, ?, ?)"
+INSERT_SNAPSHOT = """
+    INSERT OR REPLACE INTO snapshots (path, category, date, frame_num, video, width, height, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _snapshot_row(image_path, video_path, timestamp, snapshot):
+    return (image_path, snapshot["category"], snapshot["date"], snapshot.get("frame_num"), video_path,
+            snapshot.get("width"), snapshot.get("height"), timestamp)
+
+def log_violation(violation_type, timestamp, image_path, video_path, snapshot=None):
+    """Insert one violation; `snapshot` metadata (category, date, frame_num,
+    width, height) also records its image in the snapshot manifest."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(INSERT_VIOLATION, (violation_type, timestamp, image_path, video_path))
+    if snapshot:
+        c.execute(INSERT_SNAPSHOT, _snapshot_row(image_path, video_path, timestamp, snapshot))
+    conn.commit()
+    conn.close()
+
+def _exit_on_sigterm(signum, frame):
+    sys.exit(128 + signum)  # Unwinds normally so pending rows are flushed
+
+class ViolationSink:
+    """Buffered violation writer that keeps one WAL-mode connection per run.
+
+    Calling the sink takes the same arguments as `log_violation`. Rows are
+    buffered and written with `executemany` in one transaction once
+    `flush_every` rows are pending, or every `flush_interval` seconds from
+    a background thread. Pending rows are flushed on `close`, when used as
+    a context manager, at interpreter exit and on SIGTERM.
+    """
+
+    def __init__(self, db_path=DB_PATH, flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL):
+        migrate(db_path)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.flush_every = flush_every
+        self.buffer = []
+        self.snapshot_buffer = []
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.busy_seconds = 0.0  # Time spent writing to the database
+
+        self._flusher = threading.Thread(target=self._flush_periodically, args=(flush_interval,),
+                                         name="violation-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+        if (threading.current_thread() is threading.main_thread()
+                and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL):
+            signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+    def __call__(self, violation_type, timestamp, image_path, video_path, snapshot=None):
+        with self.lock:
+            self.buffer.append((violation_type, timestamp, image_path, video_path))
+            if snapshot:
+                self.snapshot_buffer.append(_snapshot_row(image_path, video_path, timestamp, snapshot))
+            if len(self.buffer) >= self.flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.buffer:
+            return
+        started = time.perf_counter()
+        with self.conn:
+            self.conn.executemany(INSERT_VIOLATION, self.buffer)
+            self.conn.executemany(INSERT_SNAPSHOT, self.snapshot_buffer)
+        seconds = time.perf_counter() - started
+        self.busy_seconds += seconds
+        metrics.observe("db_flush_seconds", seconds)
+        metrics.inc("db_rows_total", len(self.buffer))
+        self.buffer = []
+        self.snapshot_buffer = []
+
+    def _flush_periodically(self, interval):
+        while not self.closed.wait(interval):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.closed.is_set():
+                self._flush_locked()
+
+    def close(self):
+        with self.lock:
+            if self.closed.is_set():
+                return
+            try:
+                self._flush_locked()
+            finally:
+                self.closed.set()
+                self.conn.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
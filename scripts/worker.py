@@ -0,0 +1,181 @@
+import sys
+import os
+import time
+import secrets
+import tempfile
+import threading
+import traceback
+import subprocess
+from multiprocessing.connection import Listener, Client
+
+# Runnable as a file (`python scripts/worker.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import metrics
+from scripts.engine import load_model
+from scripts.jobs import create_job, start_runners, wait_for_job
+from scripts.stream import run_stream
+from scripts.violation_db import create_violations_table
+
+# Local-only endpoint; the authkey keeps other local processes from submitting pickles, so it
+# must be secret: DETECTION_WORKER_AUTHKEY, or a random key kept in an owner-only file
+WORKER_ADDRESS = ("127.0.0.1", int(os.getenv("DETECTION_WORKER_PORT", "6001")))
+WORKER_KEY_FILE = os.getenv("DETECTION_WORKER_KEY_FILE", "data/worker.key")
+WORKER_LOG = "logs/detection_worker.log"
+STARTUP_TIMEOUT = 120
+
+# Live streams run one at a time on their own model; file jobs go through the job queue
+_stream_lock = threading.Lock()
+_wake_runners = None
+
+def worker_authkey(path=WORKER_KEY_FILE):
+    """The secret shared by the app and the worker.
+
+    DETECTION_WORKER_AUTHKEY takes precedence. Otherwise the key is read
+    from `path`, which whichever side starts first creates with a random key
+    and mode 0600. A key file others can read is refused.
+    """
+    key = os.getenv("DETECTION_WORKER_AUTHKEY")
+    if key:
+        return key.encode()
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".")  # Created 0600
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp_path, path)  # Atomic and never overwrites a key the other side just wrote
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+    if os.name == "posix" and os.stat(path).st_mode & 0o077:
+        raise Exception(f"Worker key file {path} is readable by other users; run chmod 600 {path}")
+    with open(path) as f:
+        key = f.read().strip()
+    if not key:
+        raise Exception(f"Worker key file {path} is empty")
+    return key.encode()
+
+# ---------------- Server ---------------- #
+
+def handle_request(request):
+    if request.get("op") == "ping":
+        return {"ok": True, "pid": os.getpid()}
+
+    if request.get("op") == "metrics":
+        return {"ok": True, "metrics": metrics.REGISTRY.snapshot()}
+
+    if request.get("op") == "wake":
+        _wake_runners.set()
+        return {"ok": True}
+
+    if request.get("op") != "stream":
+        return {"ok": False, "error": f"Unknown operation: {request.get('op')}"}
+
+    with _stream_lock:
+        try:
+            result = run_stream(request["source"], request.get("modules"), model=load_model(slot="stream"),
+                                **request.get("options", {}))
+            return {"ok": True, **result}
+        except Exception as e:
+            return {"ok": False, "error": str(e), "traceback": traceback.format_exc()}
+
+def handle_connection(conn):
+    with conn:
+        try:
+            request = conn.recv()
+            conn.send(handle_request(request))
+        except (EOFError, ConnectionError):
+            pass  # Client went away (e.g. Streamlit rerun); nothing to answer
+
+def serve():
+    global _wake_runners
+    authkey = worker_authkey()  # Refuses to serve without a private key
+    # Own the port before touching the jobs table: a second worker started by racing
+    # ensure_worker() calls must stop here, not requeue the running worker's jobs
+    try:
+        listener = Listener(WORKER_ADDRESS, authkey=authkey)
+    except OSError as e:
+        raise Exception(f"Cannot listen on {WORKER_ADDRESS[0]}:{WORKER_ADDRESS[1]} ({e}); "
+                        f"is another detection worker running?")
+
+    with listener:
+        create_violations_table()
+        _wake_runners = start_runners()
+        if metrics.METRICS_PORT:
+            metrics.serve_metrics()
+        print(f"[INFO] Detection worker listening on {WORKER_ADDRESS[0]}:{WORKER_ADDRESS[1]}")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=handle_connection, args=(conn,), daemon=True).start()
+
+# ---------------- Client ---------------- #
+
+def _request(request):
+    with Client(WORKER_ADDRESS, authkey=worker_authkey()) as conn:
+        conn.send(request)
+        return conn.recv()
+
+def start_worker():
+    os.makedirs(os.path.dirname(WORKER_LOG), exist_ok=True)
+    log = open(WORKER_LOG, "a")
+    subprocess.Popen(
+        [sys.executable, "-m", "scripts.worker"],
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        cwd=os.getcwd(),  # Job paths are relative to the app's working directory
+        start_new_session=True
+    )
+    log.close()
+
+def ensure_worker():
+    """Ping the worker, starting it in the background if it is not running."""
+    try:
+        return _request({"op": "ping"})
+    except ConnectionRefusedError:
+        start_worker()
+
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(0.5)
+        try:
+            return _request({"op": "ping"})
+        except ConnectionRefusedError:
+            continue
+    raise Exception(f"Detection worker did not start; see {WORKER_LOG}")
+
+def enqueue_job(video_path, modules=None, submitted_by=None, **options):
+    """Queue a detection job for the worker and return its id without waiting.
+
+    `options` are passed through to `run_engine` (e.g. `batch_size`), except
+    `workers`, which splits the video across that many processes.
+    """
+    job_id = create_job(video_path, modules, options, submitted_by)
+    ensure_worker()
+    _request({"op": "wake"})
+    return job_id
+
+def submit_job(video_path, modules=None, **options):
+    """Queue a job and wait for its outputs."""
+    job = wait_for_job(enqueue_job(video_path, modules, **options))
+    if job["status"] == "done":
+        return {"ok": True, **job["result"]}
+    return {"ok": False, "error": f"Job {job['id']} {job['status']}", "traceback": job["error"]}
+
+def submit_stream(source, modules=None, duration=60, **options):
+    """Run the engine on a live source in the worker for `duration` seconds."""
+    ensure_worker()
+    return _request({"op": "stream", "source": source, "modules": modules,
+                     "options": dict(options, duration=duration)})
+
+if __name__ == "__main__":
+    try:
+        serve()
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        sys.exit(1)
@@ -1,8 +1,13 @@
+import sys
 import os
-from ultralytics import YOLO
 import cv2
 
-model = YOLO("yolov8n.pt")
+# Runnable as a file (`python scripts/yolo_test.py`) as well as with -m from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.engine import load_model
+
+model = load_model("yolov8n.pt")
 video_path = "input_videos/test_traffic.mp4"
 
 cap = cv2.VideoCapture(video_path)
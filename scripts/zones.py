@@ -0,0 +1,54 @@
+import os
+import json
+
+import numpy as np
+
+CAMERA_CONFIG = os.getenv("CAMERA_CONFIG", "config/cameras.json")
+# Context kept around the zones when cropping, so boxes on a zone edge are still detected whole
+ROI_MARGIN = int(os.getenv("ROI_MARGIN", "32"))
+
+def load_cameras(path=CAMERA_CONFIG):
+    """Camera name -> settings from the camera config, or {} when there is none.
+
+    Each camera has `zones`, mapping a rule name to a polygon of [x, y]
+    points, and optionally the `size` ([width, height]) those points were
+    drawn at; zones are rescaled when the video has another resolution.
+    See config/cameras.example.json.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("cameras", {})
+
+def camera_config(camera, path=CAMERA_CONFIG):
+    cameras = load_cameras(path)
+    if camera not in cameras:
+        raise Exception(f"Unknown camera: {camera} (not in {path})")
+    return cameras[camera]
+
+def camera_zones(camera, size, path=CAMERA_CONFIG):
+    """Rule name -> (K, 2) float32 polygon in the pixel coordinates of a `size` frame."""
+    config = camera_config(camera, path)
+    width, height = size
+    scale = np.array([1.0, 1.0], dtype=np.float32)
+    if config.get("size"):
+        scale = np.array([width / config["size"][0], height / config["size"][1]], dtype=np.float32)
+    return {rule: np.array(points, dtype=np.float32).reshape(-1, 2) * scale
+            for rule, points in config.get("zones", {}).items()}
+
+def inference_region(zones, size, margin=ROI_MARGIN):
+    """(x1, y1, x2, y2) crop covering every zone plus `margin`, or None for the full frame.
+
+    `zones` holds one polygon per rule in the run; a rule without a zone
+    (None) needs the whole frame, so nothing can be cropped.
+    """
+    if not zones or any(zone is None for zone in zones):
+        return None
+    points = np.concatenate(zones)
+    width, height = size
+    x1, y1 = np.floor(points.min(axis=0)).astype(int) - margin
+    x2, y2 = np.ceil(points.max(axis=0)).astype(int) + margin
+    region = (max(0, x1), max(0, y1), min(width, x2), min(height, y2))
+    if region == (0, 0, width, height):
+        return None
+    return region
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# Make `scripts` and the top-level modules importable however pytest is started
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the test from an empty directory, since the pipeline writes to relative paths
+    (snapshots/, output/, cache/, logs/, data/)."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,69 @@
+import numpy as np
+
+from scripts.boxes import (MOTORCYCLE_CLS, PERSON_CLS, anchor_points, as_array, associate_riders,
+                           iou_matrix, points_in_polygon)
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32)
+
+class FakeTensor:
+    """Stands in for a torch tensor: only `.cpu().numpy()` is used."""
+
+    def __init__(self, data):
+        self.data = np.asarray(data)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+def test_iou_matrix_values():
+    a = boxes([0, 0, 10, 10], [20, 20, 30, 30])
+    b = boxes([0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 110, 110])
+    iou = iou_matrix(a, b)
+    assert iou.shape == (2, 3)
+    np.testing.assert_allclose(iou[0], [1.0, 50 / 150, 0.0], rtol=1e-6)
+    np.testing.assert_allclose(iou[1], [0.0, 0.0, 0.0])
+
+def test_iou_matrix_empty_and_degenerate():
+    assert iou_matrix(boxes([0, 0, 10, 10]), np.zeros((0, 4), dtype=np.float32)).shape == (1, 0)
+    # Zero-area boxes must not divide by zero
+    assert iou_matrix(boxes([5, 5, 5, 5]), boxes([5, 5, 5, 5]))[0, 0] == 0.0
+
+def test_as_array_reshapes_and_accepts_tensors():
+    assert as_array([]).shape == (0, 6)
+    rows = [[0, 0, 10, 10, 0.9, 3], [1, 1, 2, 2, 0.5, 0]]
+    for data in (rows, np.array(rows, dtype=np.float64), FakeTensor(rows)):
+        out = as_array(data)
+        assert out.dtype == np.float32
+        np.testing.assert_array_equal(out, np.array(rows, dtype=np.float32))
+
+def test_anchor_points_are_bottom_centres():
+    dets = boxes([0, 0, 10, 20, 0.9, 3], [10, 5, 30, 15, 0.8, 2])
+    np.testing.assert_array_equal(anchor_points(dets), [[5, 20], [20, 15]])
+
+def test_points_in_polygon():
+    square = np.array([[0, 0], [10, 0], [10, 10], [0, 10]], dtype=np.float32)
+    points = np.array([[5, 5], [15, 5], [-1, 5], [5, 11], [9.9, 0.1]], dtype=np.float32)
+    np.testing.assert_array_equal(points_in_polygon(points, square), [True, False, False, False, True])
+
+def test_points_in_concave_polygon():
+    # A "U": the notch between the arms is outside
+    u_shape = np.array([[0, 0], [30, 0], [30, 30], [20, 30], [20, 10], [10, 10], [10, 30], [0, 30]],
+                       dtype=np.float32)
+    points = np.array([[5, 20], [25, 20], [15, 20], [15, 5]], dtype=np.float32)
+    np.testing.assert_array_equal(points_in_polygon(points, u_shape), [True, True, False, True])
+
+def test_associate_riders_counts_persons_inside_each_motorcycle():
+    dets = boxes(
+        [0, 100, 100, 200, 0.9, MOTORCYCLE_CLS],
+        [200, 100, 300, 200, 0.9, MOTORCYCLE_CLS],
+        [10, 50, 40, 180, 0.9, PERSON_CLS],
+        [50, 50, 90, 230, 0.9, PERSON_CLS],    # Feet below the bike, within the margin
+        [60, 50, 95, 300, 0.9, PERSON_CLS],    # Too far below to be riding
+        [210, 50, 250, 180, 0.05, PERSON_CLS],  # Dropped by min_conf
+    )
+    pairs = associate_riders(dets, min_conf=0.1)
+    assert pairs["riders"].shape == (2, 3)
+    np.testing.assert_array_equal(pairs["rider_counts"], [2, 0])
@@ -0,0 +1,80 @@
+import os
+import re
+import threading
+
+import cv2
+import pytest
+
+from scripts.backends import StubDetector
+from scripts.benchmark import make_synthetic_video
+from scripts.engine import run_engine
+
+FRAMES = 120
+MODULES = ["triple", "helmet"]
+
+@pytest.fixture
+def clip(workdir):
+    make_synthetic_video("clip.mp4", 320, 240, FRAMES)
+    return "clip.mp4"
+
+def detect(clip, **options):
+    """Run the engine with the stub detector; returns (result, logged rows without timestamps)."""
+    rows = []
+    result = run_engine(clip, MODULES, model=StubDetector(infer_ms=0), alert=False, run_id="test",
+                        log=lambda violation_type, timestamp, image_path, video_path, **meta:
+                        rows.append((violation_type, image_path, video_path)), **options)
+    return result, rows
+
+def frame_number(image_path):
+    return int(re.search(r"_violation_(\d+)_", image_path).group(1))
+
+@pytest.mark.parametrize("track", [True, False])
+def test_stub_run_logs_every_snapshot_it_records(clip, track):
+    result, rows = detect(clip, track=track, max_snapshots=None)
+    stats = result["stats"]
+    assert stats["frames"] == FRAMES
+    assert stats["inferred"] + stats["skipped"] == FRAMES
+    assert rows, "the stub detector should trigger violations"
+
+    for module in MODULES:
+        outputs = result["outputs"][module]
+        logged = [path for _, path, _ in rows if f"/{module}/" in path]
+        assert logged == outputs["snapshots"]  # Rows follow the order snapshots were taken in
+        assert all(os.path.exists(path) for path in logged)
+        if not track:
+            # Tracked snapshots are taken when a track ends, at its best frame, so only
+            # untracked ones are in frame order
+            numbers = [frame_number(path) for path in logged]
+            assert numbers == sorted(numbers)
+        cap = cv2.VideoCapture(outputs["output"])
+        assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == FRAMES
+        cap.release()
+
+@pytest.mark.parametrize("batch_size", [1, 7])
+def test_batch_size_does_not_change_the_results(clip, batch_size):
+    _, baseline = detect(clip, pipelined=False)
+    _, rows = detect(clip, pipelined=False, batch_size=batch_size)
+    assert rows == baseline
+
+@pytest.mark.parametrize("options", [{"pipelined": True}, {"pipelined": True, "batch_size": 7, "queue_size": 1}])
+def test_pipelining_does_not_change_the_results(clip, options):
+    _, baseline = detect(clip, pipelined=False)
+    result, rows = detect(clip, **options)
+    assert rows == baseline
+    assert set(result["stats"]["stages"]) == {"decode", "infer", "write"}
+
+def test_cancel_keeps_what_was_recorded(clip):
+    seen = []
+    result, rows = detect(clip, progress=seen.append, cancel=lambda: bool(seen) and seen[-1] >= 40)
+    assert result["stats"].get("cancelled")
+    assert result["stats"]["frames"] < FRAMES
+    assert all(frame_number(path) < result["stats"]["frames"] for _, path, _ in rows)
+
+def test_failed_setup_leaves_no_threads_behind(clip):
+    open("blocked", "w").close()
+    threads = set(threading.enumerate())
+    # An unknown camera fails before anything is opened; an unusable output_dir fails while opening the videos
+    for options in ({"camera": "nowhere"}, {"output_dir": "blocked"}):
+        with pytest.raises(Exception):
+            run_engine(clip, MODULES, model=StubDetector(infer_ms=0), alert=False, **options)
+        assert set(threading.enumerate()) - threads == set()
@@ -0,0 +1,104 @@
+import os
+import threading
+
+import pytest
+
+from scripts import jobs
+from scripts.benchmark import make_synthetic_video
+from scripts.jobs import (JobProgress, claim_next_job, create_job, eta_seconds, get_job, list_jobs, request_cancel,
+                          requeue_interrupted, run_job)
+from scripts.violation_db import DB_PATH, migrate
+
+@pytest.fixture
+def db(workdir):
+    migrate(DB_PATH)
+    return DB_PATH
+
+def set_status(job_id, status, db_path=DB_PATH):
+    conn = jobs._connect(db_path)
+    with conn:
+        conn.execute("UPDATE jobs SET status = ?, frames_done = 40 WHERE id = ?", (status, job_id))
+    conn.close()
+
+def test_create_job_pins_run_defaults(db):
+    job = get_job(create_job("clip.mp4", ["helmet"], {"track": False}, submitted_by="alice"))
+    assert job["status"] == "queued" and job["modules"] == ["helmet"] and job["submitted_by"] == "alice"
+    assert job["options"]["track"] is False
+    assert {"backend", "int8", "snapshot_format", "snapshot_quality"} <= set(job["options"])
+
+def test_jobs_are_claimed_oldest_first_and_once(db):
+    ids = [create_job(f"clip{i}.mp4") for i in range(3)]
+    first = claim_next_job()
+    assert first["id"] == ids[0] and first["status"] == "running" and first["started_at"]
+    assert [claim_next_job()["id"] for _ in range(2)] == ids[1:]
+    assert claim_next_job() is None
+
+def test_concurrent_claims_never_share_a_job(db):
+    ids = {create_job(f"clip{i}.mp4") for i in range(20)}
+    claimed, lock = [], threading.Lock()
+
+    def claim_all():
+        while (job := claim_next_job()) is not None:
+            with lock:
+                claimed.append(job["id"])
+
+    runners = [threading.Thread(target=claim_all) for _ in range(4)]
+    for runner in runners:
+        runner.start()
+    for runner in runners:
+        runner.join()
+    assert sorted(claimed) == sorted(ids)
+
+def test_request_cancel(db):
+    queued, running, done = create_job("a.mp4"), create_job("b.mp4"), create_job("c.mp4")
+    set_status(running, "running")
+    set_status(done, "done")
+    for job_id in (queued, running, done):
+        request_cancel(job_id)
+
+    assert get_job(queued)["status"] == "cancelled"
+    # A running job keeps running until its runner sees the request
+    assert (get_job(running)["status"], get_job(running)["cancel_requested"]) == ("running", 1)
+    assert (get_job(done)["status"], get_job(done)["cancel_requested"]) == ("done", 0)
+
+def test_requeue_interrupted_resets_running_jobs_only(db):
+    running, done = create_job("a.mp4"), create_job("b.mp4")
+    set_status(running, "running")
+    set_status(done, "done")
+    assert requeue_interrupted() == 1
+    assert (get_job(running)["status"], get_job(running)["frames_done"]) == ("queued", 0)
+    assert get_job(done)["status"] == "done"
+    assert [job["id"] for job in list_jobs(statuses=["queued"])] == [running]
+
+def test_progress_is_written_and_picks_up_cancel(db, monkeypatch):
+    monkeypatch.setattr(jobs, "PROGRESS_INTERVAL", 0.0)
+    job_id = create_job("a.mp4")
+    set_status(job_id, "running")
+    progress = JobProgress(job_id, total_frames=100)
+    progress(25)
+    job = get_job(job_id)
+    assert (job["total_frames"], job["frames_done"]) == (100, 25) and job["fps"] > 0
+    assert eta_seconds(job) == pytest.approx(75 / job["fps"])
+    assert not progress.cancelled
+
+    request_cancel(job_id)
+    progress(30)
+    assert progress.cancelled
+
+def test_run_job_with_the_stub_backend(db):
+    make_synthetic_video("clip.mp4", 320, 240, 60)
+    job_id = create_job("clip.mp4", ["helmet"], {"backend": "stub", "workers": 1})
+    run_job(claim_next_job())
+
+    job = get_job(job_id)
+    assert job["status"] == "done", job["error"]
+    outputs = job["result"]["outputs"]["helmet"]
+    assert outputs["output"] == os.path.join(jobs.JOBS_OUTPUT_DIR, str(job_id), "helmet_output.mp4")
+    assert outputs["snapshots"] and all(f"_job{job_id}." in path for path in outputs["snapshots"])
+    assert len(job["result"]["violations"]) == len(outputs["snapshots"])
+
+def test_failed_jobs_record_the_error(db):
+    job_id = create_job("missing.mp4", ["helmet"], {"backend": "stub", "workers": 1})
+    run_job(claim_next_job())
+    job = get_job(job_id)
+    assert job["status"] == "failed" and "Unable to open video file" in job["error"]
@@ -0,0 +1,137 @@
+import time
+import smtplib
+
+import pytest
+
+from mail_utils import AlertDispatcher
+from scripts.violation_db import DB_PATH, migrate, record_upload
+
+class FakeSMTP:
+    """Records sent messages; `failures` lists the errors raised by the next sends."""
+
+    def __init__(self, server):
+        self.server = server
+
+    def send_message(self, msg):
+        if self.server.failures:
+            raise self.server.failures.pop(0)
+        self.server.sent.append((time.monotonic(), msg))
+
+    def quit(self):
+        pass
+
+class FakeServer:
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.sent = []
+        self.connections = 0
+
+    def connect(self):
+        self.connections += 1
+        return FakeSMTP(self)
+
+    def bodies(self):
+        return [msg.get_body(("plain",)).get_content() for _, msg in self.sent]
+
+def dispatcher(server, **options):
+    options = {"rate_limit": 0, "digest_size": 10, "digest_window": 0, "retries": 3, "backoff": 0.01, **options}
+    return AlertDispatcher(to_email="ops@example.com", connect=server.connect, **options)
+
+def alert(alerts, i):
+    alerts("Helmet Violation", f"2024-01-01 10:00:{i:02d}", f"snapshots/helmet/h_{i}.jpg", "clip.mp4")
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_alerts_in_one_window_go_out_as_one_digest(workdir):
+    server = FakeServer()
+    alerts = dispatcher(server, digest_window=0.3)
+    for i in range(3):
+        alert(alerts, i)
+    wait_for(lambda: alerts.sent == 3)
+    alerts.close()
+
+    assert len(server.sent) == 1
+    msg = server.sent[0][1]
+    assert msg["Subject"] == "🚦 3 traffic violations detected" and msg["To"] == "ops@example.com"
+    assert all(f"h_{i}.jpg" in server.bodies()[0] for i in range(3))
+    assert server.connections == 1
+
+def test_digests_are_capped_at_digest_size(workdir):
+    server = FakeServer()
+    alerts = dispatcher(server, digest_size=2, digest_window=0.2)
+    for i in range(5):
+        alert(alerts, i)
+    alerts.close()
+    assert [body.count("Helmet Violation") for body in server.bodies()] == [2, 2, 1]
+    assert server.sent[-1][1]["Subject"] == "🚦 Helmet Violation detected"
+
+def test_close_sends_what_is_queued_without_waiting_for_the_window(workdir):
+    server = FakeServer()
+    alerts = dispatcher(server, digest_window=60)
+    alert(alerts, 0)
+    started = time.monotonic()
+    alerts.close()
+    assert time.monotonic() - started < 5
+    assert alerts.sent == 1
+
+def test_mails_are_rate_limited(workdir):
+    server = FakeServer()
+    alerts = dispatcher(server, rate_limit=600, digest_size=1)  # One mail per 0.1 s
+    for i in range(3):
+        alert(alerts, i)
+    alerts.close()
+    times = [sent_at for sent_at, _ in server.sent]
+    assert len(times) == 3
+    assert all(later - earlier >= 0.09 for earlier, later in zip(times, times[1:]))
+
+def test_transient_failures_are_retried_on_a_new_connection(workdir):
+    server = FakeServer([smtplib.SMTPServerDisconnected("gone"), ConnectionResetError("reset")])
+    alerts = dispatcher(server)
+    alert(alerts, 0)
+    alerts.close()
+    assert (alerts.sent, alerts.failed) == (1, 0)
+    assert server.connections == 3
+
+def test_retries_give_up_after_the_limit(workdir):
+    server = FakeServer([smtplib.SMTPServerDisconnected("gone")] * 10)
+    alerts = dispatcher(server, retries=2)
+    alert(alerts, 0)
+    alerts.close()
+    assert (alerts.sent, alerts.failed) == (0, 1)
+    assert server.connections == 3
+
+def test_permanent_failures_are_not_retried(workdir):
+    server = FakeServer([smtplib.SMTPRecipientsRefused({"ops@example.com": (550, b"no such user")})])
+    alerts = dispatcher(server)
+    alert(alerts, 0)
+    alerts.close()
+    assert (alerts.sent, alerts.failed) == (0, 1)
+    assert server.connections == 1
+
+def test_dispatcher_survives_unexpected_errors(workdir):
+    server = FakeServer([ValueError("bad message")])
+    alerts = dispatcher(server, digest_size=1)
+    alert(alerts, 0)
+    wait_for(lambda: alerts.failed == 1)
+    alert(alerts, 1)
+    alerts.close()
+    assert alerts.sent == 1
+    assert "h_1.jpg" in server.bodies()[0]
+
+def test_a_recipient_is_required():
+    with pytest.raises(Exception, match="No alert recipient"):
+        AlertDispatcher(to_email=None)
+
+def test_digests_name_uploads_as_they_were_uploaded(workdir):
+    upload = "input_videos/" + "ab" * 32 + ".mp4"
+    migrate(DB_PATH)
+    record_upload(upload, "junction.mp4")
+    server = FakeServer()
+    alerts = dispatcher(server)
+    alerts("Helmet Violation", "2024-01-01 10:00:00", "snapshots/helmet/h_0.jpg", upload)
+    alerts.close()
+    assert "Helmet Violation  junction.mp4" in server.bodies()[0]
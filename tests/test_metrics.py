@@ -0,0 +1,94 @@
+import json
+import urllib.request
+
+from scripts import metrics
+from scripts.engine import RunMetrics
+from scripts.metrics import Registry, Summary, log_event, serve_metrics
+
+def test_render_counters_gauges_and_summaries():
+    registry = Registry()
+    registry.inc("frames_total", 3, result="inferred")
+    registry.inc("frames_total", 2, result="inferred")
+    registry.set("fps", 12.5, source="a.mp4", run="job1")
+    registry.add("runs_active", 1)
+    for value in range(1, 101):
+        registry.observe("inference_seconds", value / 100)
+
+    assert registry.render().splitlines() == [
+        "# HELP detection_fps Frames per second of a run over the last interval",
+        "# TYPE detection_fps gauge",
+        'detection_fps{run="job1",source="a.mp4"} 12.5',
+        "# HELP detection_frames_total Frames processed, by whether they were inferred or skipped as static",
+        "# TYPE detection_frames_total counter",
+        'detection_frames_total{result="inferred"} 5',
+        "# HELP detection_inference_seconds Latency of one model call (one batch)",
+        "# TYPE detection_inference_seconds summary",
+        'detection_inference_seconds{quantile="0.5"} 0.51',
+        'detection_inference_seconds{quantile="0.9"} 0.91',
+        'detection_inference_seconds{quantile="0.99"} 1.0',
+        "detection_inference_seconds_sum 50.5",
+        "detection_inference_seconds_count 100",
+        "# HELP detection_runs_active Detection runs in progress",
+        "# TYPE detection_runs_active gauge",
+        "detection_runs_active 1",
+    ]
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.set("fps", 1, source='we"ird\\name\n.mp4')
+    assert 'detection_fps{source="we\\"ird\\\\name\\n.mp4"} 1' in registry.render()
+
+def test_unknown_metrics_render_as_untyped():
+    registry = Registry()
+    registry.inc("custom")
+    assert "# TYPE detection_custom untyped" in registry.render()
+
+def test_removed_gauges_are_not_rendered():
+    registry = Registry()
+    registry.set("fps", 3, source="a.mp4", run="job1")
+    registry.set("fps", 4, source="a.mp4", run="job2")
+    registry.remove("fps", run="job1", source="a.mp4")
+    assert registry.snapshot() == {"fps": [{"labels": {"run": "job2", "source": "a.mp4"}, "value": 4}]}
+
+def test_summary_quantiles_use_the_recent_window():
+    summary = Summary(window=10)
+    assert summary.quantiles() == {0.5: None, 0.9: None, 0.99: None}
+    for value in range(100):
+        summary.observe(value)
+    assert (summary.count, summary.sum) == (100, sum(range(100)))
+    assert summary.quantiles((0.0, 0.5)) == {0.0: 90, 0.5: 95}
+
+def test_concurrent_runs_on_one_video_keep_their_own_gauges(workdir):
+    stats = {"frames": 10, "inferred": 10, "skipped": 0}
+    first = RunMetrics("input_videos/same.mp4", dict(stats), dict, {"snapshot": lambda: 1}, "run-a")
+    second = RunMetrics("input_videos/same.mp4", dict(stats), dict, {"snapshot": lambda: 2}, "run-b")
+    first.report()
+    second.report()
+    first.close("completed")
+
+    series = metrics.REGISTRY.snapshot()["queue_depth"]
+    depths = {item["labels"]["run"]: item["value"] for item in series if item["labels"].get("source") == "same.mp4"}
+    assert depths == {"run-b": 2}
+    second.close("completed")
+
+def test_log_event_appends_json_lines(tmp_path):
+    path = str(tmp_path / "logs" / "events.jsonl")
+    log_event("run_finished", path, run="job1", frames=10)
+    log_event("run_failed", path, run="job2")
+    events = [json.loads(line) for line in open(path)]
+    assert [(e["event"], e["run"]) for e in events] == [("run_finished", "job1"), ("run_failed", "job2")]
+    assert events[0]["frames"] == 10 and "ts" in events[0]
+    log_event("ignored", "")  # An empty path disables the log
+
+def test_endpoint_serves_the_registry():
+    metrics.inc("violations_total", rule="endpoint-test")
+    server = serve_metrics(port=0)
+    try:
+        base = f"http://127.0.0.1:{server.server_port}"
+        text = urllib.request.urlopen(f"{base}/metrics", timeout=5).read().decode()
+        assert 'detection_violations_total{rule="endpoint-test"}' in text
+        data = json.loads(urllib.request.urlopen(f"{base}/metrics.json", timeout=5).read())
+        assert {"labels": {"rule": "endpoint-test"}, "value": 1} in data["violations_total"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,49 @@
+import numpy as np
+
+from scripts.motion import MotionGate
+
+def scene(value=60, size=(240, 320)):
+    return np.full((*size, 3), value, dtype=np.uint8)
+
+def with_block(frame, x1, y1, x2, y2, value=230):
+    frame = frame.copy()
+    frame[y1:y2, x1:x2] = value
+    return frame
+
+def test_first_frame_is_always_inferred():
+    gate = MotionGate(threshold=0.5)
+    assert gate.should_infer(scene())
+    assert (gate.inferred, gate.skipped) == (1, 0)
+
+def test_static_frames_are_skipped_until_min_stride():
+    gate = MotionGate(threshold=0.01, min_stride=5)
+    decisions = [gate.should_infer(scene()) for _ in range(11)]
+    assert decisions == [True, False, False, False, False, True, False, False, False, False, True]
+    assert (gate.inferred, gate.skipped) == (3, 8)
+
+def test_without_min_stride_static_frames_are_never_rechecked():
+    gate = MotionGate(threshold=0.01, min_stride=0)
+    decisions = [gate.should_infer(scene()) for _ in range(50)]
+    assert decisions == [True] + [False] * 49
+
+def test_changes_are_measured_against_the_last_inferred_frame():
+    gate = MotionGate(threshold=0.05, min_stride=100)
+    base = scene()
+    assert gate.should_infer(base)
+    # A small change stays below the threshold...
+    assert not gate.should_infer(with_block(base, 0, 0, 20, 20))
+    # ...a large one does not, and becomes the new reference
+    moved = with_block(base, 0, 0, 160, 120)
+    assert gate.should_infer(moved)
+    assert not gate.should_infer(moved)
+    # Small steps add up, since each frame is compared with the reference, not its predecessor
+    # A block growing 8 px a frame: each frame differs little from the one before it
+    decisions = [gate.should_infer(with_block(moved, 200, 0, 200 + width, 240)) for width in range(8, 72, 8)]
+    assert not decisions[0] and any(decisions)
+
+def test_noise_below_the_pixel_delta_is_ignored():
+    gate = MotionGate(threshold=0.01, min_stride=100)
+    base = scene()
+    assert gate.should_infer(base)
+    noise = np.random.default_rng(0).integers(-10, 10, base.shape)
+    assert not gate.should_infer((base + noise).astype(np.uint8))
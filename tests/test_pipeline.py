@@ -0,0 +1,53 @@
+import itertools
+import threading
+
+import pytest
+
+from scripts.pipeline import Stage, stage_stats
+
+def test_items_arrive_in_order():
+    stage = Stage("numbers", range(1000), maxsize=4)
+    assert list(stage) == list(range(1000))
+    assert stage.items == 1000
+    assert stage.max_depth <= 4
+
+def test_errors_are_raised_in_the_consumer_after_earlier_items():
+    def produce():
+        yield 1
+        yield 2
+        raise ValueError("bad frame")
+
+    stage = Stage("failing", produce())
+    seen = []
+    with pytest.raises(ValueError, match="bad frame"):
+        for item in stage:
+            seen.append(item)
+    assert seen == [1, 2]
+
+def test_errors_pass_through_chained_stages():
+    def produce():
+        yield 1
+        raise ValueError("decode failed")
+
+    decode = Stage("decode", produce())
+    infer = Stage("infer", (item * 10 for item in decode), upstream=decode)
+    with pytest.raises(ValueError, match="decode failed"):
+        list(infer)
+
+def test_close_stops_a_blocked_producer_and_its_upstream():
+    decode = Stage("decode", itertools.count(), maxsize=2)
+    infer = Stage("infer", (item * 10 for item in decode), maxsize=2, upstream=decode)
+    iterator = iter(infer)
+    assert [next(iterator) for _ in range(3)] == [0, 10, 20]
+
+    closer = threading.Thread(target=infer.close)
+    closer.start()
+    closer.join(timeout=5)
+    assert not closer.is_alive()
+    assert not decode._thread.is_alive() and not infer._thread.is_alive()
+
+def test_stage_stats():
+    stats = stage_stats(items=50, busy=1.0, elapsed=2.0, max_depth=3)
+    assert stats == {"items": 50, "busy_seconds": 1.0, "items_per_second": 25.0, "utilization": 0.5,
+                     "max_queue_depth": 3}
+    assert stage_stats(0, 0.0, 0.0)["items_per_second"] is None
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from scripts import result_cache
+from scripts.result_cache import RESULT_FILE, cache_key, evict, lookup, store
+
+@pytest.fixture
+def video(workdir):
+    with open("clip.mp4", "wb") as f:
+        f.write(b"not really a video")
+    return "clip.mp4"
+
+def write(path, size=100):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+def fake_result(name="run", size=100):
+    video = write(f"output/{name}/helmet_output.mp4", size)
+    snapshots = [write(f"snapshots/{name}_{i}.jpg", size) for i in range(2)]
+    return {"outputs": {"helmet": {"output": video, "snapshots": snapshots, "frames": [3, 9]}},
+            "stats": {"frames": 10}, "violations": [["Helmet Violation", "2024-01-01 10:00:00"]]}
+
+# ---------------- Keys ---------------- #
+
+def test_key_ignores_speed_only_options(video):
+    key = cache_key(video, ["helmet", "lane"])
+    assert cache_key(video, ["lane", "helmet"]) == key
+    assert cache_key(video, ["helmet", "lane"], batch_size=16, pipelined=True, workers=4) == key
+
+@pytest.mark.parametrize("options", [
+    {"backend": "stub"}, {"int8": True}, {"snapshot_format": "webp"}, {"snapshot_quality": 50},
+    {"snapshot_crop_margin": 20}, {"track": False}, {"max_snapshots": None}, {"output_mode": "none"},
+    {"start_frame": 100}, {"motion_threshold": 0.3},
+])
+def test_key_changes_with_what_is_detected_or_written(video, options):
+    assert cache_key(video, ["helmet"], **options) != cache_key(video, ["helmet"])
+
+def test_key_follows_the_video_content(video):
+    key = cache_key(video, ["helmet"])
+    with open(video, "ab") as f:
+        f.write(b"!")
+    assert cache_key(video, ["helmet"]) != key
+
+# ---------------- Lookup / store ---------------- #
+
+def test_store_then_lookup(workdir):
+    store("k1", fake_result(), cache_dir="cache")
+    result = lookup("k1", cache_dir="cache")
+    assert result["cached"]
+    outputs = result["outputs"]["helmet"]
+    assert outputs["output"] == os.path.join("cache", "k1", "helmet_output.mp4")
+    assert all(os.path.exists(path) for path in [outputs["output"], *outputs["snapshots"]])
+    assert outputs["frames"] == [3, 9]
+    assert result["violations"] == [["Helmet Violation", "2024-01-01 10:00:00"]]
+    assert lookup("missing", cache_dir="cache") is None
+
+def test_lookup_drops_entries_with_missing_files(workdir):
+    store("k1", fake_result(), cache_dir="cache")
+    os.remove(lookup("k1", cache_dir="cache")["outputs"]["helmet"]["snapshots"][0])
+    assert lookup("k1", cache_dir="cache") is None
+    assert not os.path.exists(os.path.join("cache", "k1"))
+
+def test_lookup_ignores_corrupt_entries(workdir):
+    write(os.path.join("cache", "k1", RESULT_FILE))
+    assert lookup("k1", cache_dir="cache") is None
+
+def test_evict_removes_least_recently_used_entries(workdir):
+    for i, key in enumerate(["old", "used", "new"]):
+        store(key, fake_result(key), cache_dir="cache")
+        os.utime(os.path.join("cache", key), (1000 + i, 1000 + i))
+    size = {key: result_cache._entry_size(os.path.join("cache", key)) for key in os.listdir("cache")}
+
+    lookup("used", cache_dir="cache")  # Now the most recently used
+    evict("cache", max_bytes=size["new"] + size["used"])
+    assert sorted(os.listdir("cache")) == ["new", "used"]
+    evict("cache", max_bytes=size["used"])
+    assert os.listdir("cache") == ["used"]
+
+def test_store_evicts_past_the_size_limit(workdir):
+    store("a", fake_result("a", size=1000), cache_dir="cache")
+    os.utime(os.path.join("cache", "a"), (1000, 1000))
+    store("b", fake_result("b", size=1000), cache_dir="cache", max_bytes=3500)
+    assert os.listdir("cache") == ["b"]
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from scripts.benchmark import make_synthetic_video
+from scripts.engine import MAX_SNAPSHOTS
+from scripts.segments import MIN_SEGMENT_FRAMES, run_segmented, split_ranges
+
+def test_unknown_length_is_one_open_range():
+    assert split_ranges(0, 4) == [(0, None)]
+    assert split_ranges(-1, 4) == [(0, None)]
+
+def test_short_videos_are_not_split():
+    assert split_ranges(MIN_SEGMENT_FRAMES - 1, 8) == [(0, MIN_SEGMENT_FRAMES - 1)]
+    assert split_ranges(10_000, 1) == [(0, 10_000)]
+
+@pytest.mark.parametrize("total", [MIN_SEGMENT_FRAMES, 1_000, 1_001, 7_919, 100_000])
+@pytest.mark.parametrize("workers", [1, 2, 3, 8, 64])
+def test_ranges_cover_the_video_contiguously(total, workers):
+    ranges = split_ranges(total, workers)
+    assert 1 <= len(ranges) <= workers
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == total
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+    assert all(start < end for start, end in ranges)
+    if len(ranges) > 1:
+        assert min(end - start for start, end in ranges[:-1]) >= MIN_SEGMENT_FRAMES
+
+@pytest.mark.parametrize("max_snapshots", [None, 7])
+def test_segmented_runs_honour_max_snapshots(workdir, max_snapshots):
+    make_synthetic_video("clip.mp4", 160, 120, 2 * MIN_SEGMENT_FRAMES)
+    result = run_segmented("clip.mp4", ["helmet"], workers=2, backend="stub", track=False, alert=False,
+                           max_snapshots=max_snapshots)
+    assert len(result["stats"]["segments"]) == 2
+    snapshots = result["outputs"]["helmet"]["snapshots"]
+    if max_snapshots is None:
+        assert len(snapshots) > MAX_SNAPSHOTS
+    else:
+        assert len(snapshots) == max_snapshots
+    assert sorted(os.listdir(os.path.dirname(snapshots[0]))) == sorted(map(os.path.basename, snapshots))
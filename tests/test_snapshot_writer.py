@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+
+from scripts.snapshot_writer import SnapshotWriter
+
+def frame(seed):
+    return np.random.default_rng(seed).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+
+def test_callbacks_run_in_submission_order(workdir):
+    writer = SnapshotWriter(workers=4)
+    order = []
+    paths = [f"snap_{i}.jpg" for i in range(40)]
+    for i, path in enumerate(paths):
+        writer.submit(path, frame(i), lambda width, height, path=path: order.append((path, width, height)))
+    writer.close()
+    assert order == [(path, 160, 120) for path in paths]
+    assert writer.queued == 0 and writer.failed == 0
+
+def test_failed_writes_are_counted_and_not_logged(workdir):
+    writer = SnapshotWriter(workers=2)
+    logged = []
+    writer.submit("missing_dir/snap.jpg", frame(0), lambda *size: logged.append("missing"))
+    writer.submit("snap.jpg", frame(1), lambda *size: logged.append("ok"))
+    writer.close()
+    assert logged == ["ok"]
+    assert writer.failed == 1
+
+def test_snapshot_is_removed_when_its_callback_fails(workdir):
+    def fail(width, height):
+        raise Exception("database is locked")
+
+    writer = SnapshotWriter(workers=1, crop_margin=5)
+    writer.submit("snap.jpg", frame(0), fail, box=[10, 10, 50, 50])
+    writer.close()
+    assert writer.unlogged == 1
+    assert not os.path.exists("snap.jpg")
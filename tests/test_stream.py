@@ -0,0 +1,30 @@
+import threading
+
+from scripts.stream import RingBuffer
+
+def test_ring_buffer_keeps_the_newest_frames():
+    buffer = RingBuffer(capacity=3)
+    for i in range(5):
+        buffer.put(i)
+    assert buffer.overwritten == 2
+    assert [buffer.get(timeout=0) for _ in range(3)] == [2, 3, 4]
+    assert buffer.get(timeout=0.01) is None
+
+def test_ring_buffer_drains_after_close():
+    buffer = RingBuffer(capacity=4)
+    buffer.put("a")
+    buffer.put("b")
+    buffer.close()
+    assert buffer.get() == "a"
+    assert buffer.get() == "b"
+    assert buffer.get() is None
+
+def test_close_wakes_a_waiting_consumer():
+    buffer = RingBuffer(capacity=2)
+    results = []
+    consumer = threading.Thread(target=lambda: results.append(buffer.get()))
+    consumer.start()
+    buffer.close()
+    consumer.join(timeout=5)
+    assert not consumer.is_alive()
+    assert results == [None]
@@ -0,0 +1,62 @@
+import numpy as np
+
+from scripts.tracker import Tracker
+
+def dets(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+def test_ids_are_stable_for_moving_objects():
+    tracker = Tracker()
+    first_ids = None
+    for step in range(10):
+        x = 10 * step
+        ids, finished = tracker.update(dets([x, 0, x + 50, 50, 0.9, 2], [x, 200, x + 50, 250, 0.9, 3]))
+        first_ids = first_ids if first_ids is not None else ids.tolist()
+        assert ids.tolist() == first_ids
+        assert finished == []
+    assert first_ids == [1, 2]
+
+def test_velocity_bridges_missed_frames():
+    tracker = Tracker()
+    for step in range(5):
+        ids, _ = tracker.update(dets([20 * step, 0, 20 * step + 40, 40, 0.9, 2]))
+    # Two frames without a detection: the last seen box no longer overlaps, its prediction does
+    tracker.update(dets())
+    tracker.update(dets())
+    ids, _ = tracker.update(dets([20 * 7, 0, 20 * 7 + 40, 40, 0.9, 2]))
+    assert ids.tolist() == [1]
+
+def test_low_confidence_detections_extend_tracks_but_never_start_them():
+    tracker = Tracker(high_thresh=0.5, low_thresh=0.1)
+    tracker.update(dets([0, 0, 50, 50, 0.9, 2]))
+    ids, _ = tracker.update(dets([2, 0, 52, 50, 0.3, 2], [300, 300, 350, 350, 0.3, 2]))
+    assert ids.tolist() == [1, -1]
+    # Below low_thresh a detection is ignored altogether
+    ids, _ = tracker.update(dets([4, 0, 54, 50, 0.05, 2]))
+    assert ids.tolist() == [-1]
+    assert list(tracker.tracks) == [1]
+
+def test_classes_are_never_matched_across():
+    tracker = Tracker()
+    tracker.update(dets([0, 0, 50, 50, 0.9, 2]))
+    ids, _ = tracker.update(dets([0, 0, 50, 50, 0.9, 3]))
+    assert ids.tolist() == [2]
+
+def test_each_detection_matches_at_most_one_track():
+    tracker = Tracker()
+    tracker.update(dets([0, 0, 50, 50, 0.9, 2], [10, 0, 60, 50, 0.9, 2]))
+    ids, _ = tracker.update(dets([5, 0, 55, 50, 0.9, 2]))
+    assert len(ids) == 1 and ids[0] in (1, 2)
+    ids, _ = tracker.update(dets([0, 0, 50, 50, 0.9, 2], [10, 0, 60, 50, 0.9, 2]))
+    assert sorted(ids.tolist()) == [1, 2]
+
+def test_tracks_finish_after_max_age_and_on_flush():
+    tracker = Tracker(max_age=2)
+    tracker.update(dets([0, 0, 50, 50, 0.9, 2], [300, 0, 350, 50, 0.9, 2]))
+    for _ in range(2):
+        _, finished = tracker.update(dets([300, 0, 350, 50, 0.9, 2]))
+        assert finished == []
+    _, finished = tracker.update(dets([300, 0, 350, 50, 0.9, 2]))
+    assert finished == [1]
+    assert tracker.flush() == [2]
+    assert tracker.tracks == {}
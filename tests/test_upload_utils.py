@@ -0,0 +1,48 @@
+import io
+import os
+import hashlib
+
+from upload_utils import content_path, store_upload
+
+class Unseekable:
+    """A stream that can only be read, like a socket or pipe."""
+
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+def test_store_upload_is_content_addressed(tmp_path):
+    data = os.urandom(10_000)
+    path, is_new = store_upload(io.BytesIO(data), directory=str(tmp_path), chunk_size=1024)
+    assert is_new
+    assert path == content_path(hashlib.sha256(data).hexdigest(), ".mp4", str(tmp_path))
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+def test_store_upload_deduplicates(tmp_path):
+    data = os.urandom(5_000)
+    first, _ = store_upload(io.BytesIO(data), directory=str(tmp_path))
+    mtime = os.path.getmtime(first)
+
+    for stream in (io.BytesIO(data), Unseekable(data)):
+        path, is_new = store_upload(stream, directory=str(tmp_path), chunk_size=512)
+        assert (path, is_new) == (first, False)
+    assert os.path.getmtime(first) == mtime
+    assert os.listdir(tmp_path) == [os.path.basename(first)]  # No temp files left behind
+
+def test_store_upload_unseekable_stream(tmp_path):
+    data = os.urandom(3_000)
+    path, is_new = store_upload(Unseekable(data), suffix=".avi", directory=str(tmp_path), chunk_size=256)
+    assert is_new and path.endswith(".avi")
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+def test_store_upload_reads_seekable_streams_from_the_start(tmp_path):
+    data = os.urandom(2_000)
+    stream = io.BytesIO(data)
+    stream.seek(1_000)
+    path, _ = store_upload(stream, directory=str(tmp_path))
+    with open(path, "rb") as f:
+        assert f.read() == data
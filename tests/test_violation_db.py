@@ -0,0 +1,310 @@
+import time
+import sqlite3
+import itertools
+
+import pytest
+
+from scripts import violation_db
+from scripts.violation_db import (DB_PATH, MIGRATIONS, SORT_COLUMNS, ViolationSink, daily_counts, hourly_counts,
+                                  migrate, query_violations, record_upload, video_counts, video_label, video_labels,
+                                  violation_totals)
+
+def schema(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(conn.execute("SELECT type, name, sql FROM sqlite_master").fetchall(), key=str)
+    finally:
+        conn.close()
+
+def scalar(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchone()[0]
+    finally:
+        conn.close()
+
+def row(i, video="clip.mp4"):
+    return ("Helmet Violation", f"2024-01-01 10:00:{i:02d}", f"snapshots/helmet/2024-01-01/h_{i}.jpg", video)
+
+SNAPSHOT = {"category": "helmet", "date": "2024-01-01", "frame_num": 7, "width": 64, "height": 48}
+
+def make_legacy_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE violations (id INTEGER PRIMARY KEY, type TEXT, timestamp TEXT, snapshot TEXT)")
+    conn.executemany("INSERT INTO violations (type, timestamp, snapshot) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+LEGACY_ROWS = [("Helmet Violation", "2024-01-01 10:00:00", "a.jpg"),
+               ("Lane Violation", "2024-01-02 11:00:00", "b.jpg")]
+
+# ---------------- Migrations ---------------- #
+
+def test_migrate_twice_is_a_no_op(workdir):
+    db = "store.db"
+    migrate(db)
+    assert scalar(db, "PRAGMA user_version") == MIGRATIONS[-1][0]
+    before = schema(db)
+    migrate(db)
+    assert scalar(db, "PRAGMA user_version") == MIGRATIONS[-1][0]
+    assert schema(db) == before
+
+def test_migrations_can_be_rerun(workdir):
+    # Every migration must survive running again, e.g. after a crash between its work and its commit
+    db = "store.db"
+    migrate(db)
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO violations (type, timestamp, image_path, video) VALUES (?, ?, ?, ?)",
+                     [("Helmet Violation", "2024-05-01 09:00:00", "x.jpg", "v.mp4")] * 3)
+    conn.commit()
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+    before = schema(db)
+
+    migrate(db)
+    assert schema(db) == before
+    assert scalar(db, "SELECT COUNT(*) FROM violations") == 3
+    assert scalar(db, "SELECT count FROM violation_type_totals WHERE type = 'Helmet Violation'") == 3
+
+def test_versions_are_increasing():
+    versions = [version for version, _ in MIGRATIONS]
+    assert versions == sorted(set(versions))
+
+def test_legacy_rows_are_imported_once_into_the_shared_store(workdir):
+    make_legacy_db("violations.db", LEGACY_ROWS)
+    assert "violations.db" in violation_db.LEGACY_DB_PATHS
+
+    migrate(DB_PATH)
+    assert scalar(DB_PATH, "SELECT COUNT(*) FROM violations") == 2
+    assert scalar(DB_PATH, "SELECT image_path FROM violations ORDER BY id LIMIT 1") == "a.jpg"
+
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    conn.execute("PRAGMA user_version = 2")
+    conn.close()
+    migrate(DB_PATH)
+    assert scalar(DB_PATH, "SELECT COUNT(*) FROM violations") == 2
+
+def test_other_stores_get_no_legacy_rows(workdir):
+    make_legacy_db("violations.db", LEGACY_ROWS)
+    migrate("scratch/violations.db")
+    assert scalar("scratch/violations.db", "SELECT COUNT(*) FROM violations") == 0
+
+def test_helmet_table_is_folded_into_violations(workdir):
+    db = "store.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE helmet_violations (id INTEGER PRIMARY KEY, timestamp TEXT, image_path TEXT, "
+                 "video_name TEXT)")
+    conn.execute("INSERT INTO helmet_violations (timestamp, image_path, video_name) "
+                 "VALUES ('2024-03-01 08:00:00', 'h.jpg', 'v.mp4')")
+    conn.commit()
+    conn.close()
+
+    migrate(db)
+    migrate(db)
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT type, image_path, video FROM violations").fetchall() == [
+        ("Helmet Violation", "h.jpg", "v.mp4")]
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'helmet_violations'").fetchone()
+    conn.close()
+
+# ---------------- Rollups ---------------- #
+
+def rollups_from_scratch(conn):
+    """What the rollup tables should hold, computed from the raw rows."""
+    return {
+        "daily": conn.execute("""
+            SELECT IFNULL(type, ''), IFNULL(substr(timestamp, 1, 10), ''), IFNULL(video, ''), COUNT(*)
+            FROM violations GROUP BY 1, 2, 3 ORDER BY 1, 2, 3""").fetchall(),
+        "hourly": conn.execute("""
+            SELECT IFNULL(type, ''), IFNULL(substr(timestamp, 1, 13), ''), COUNT(*)
+            FROM violations GROUP BY 1, 2 ORDER BY 1, 2""").fetchall(),
+        "totals": conn.execute("SELECT IFNULL(type, ''), COUNT(*) FROM violations GROUP BY 1 ORDER BY 1").fetchall(),
+    }
+
+def rollups(conn):
+    return {
+        "daily": conn.execute("SELECT type, day, video, count FROM violation_daily_rollup WHERE count > 0 "
+                              "ORDER BY 1, 2, 3").fetchall(),
+        "hourly": conn.execute("SELECT type, hour, count FROM violation_hourly_rollup WHERE count > 0 "
+                               "ORDER BY 1, 2").fetchall(),
+        "totals": conn.execute("SELECT type, count FROM violation_type_totals WHERE count > 0 "
+                               "ORDER BY 1").fetchall(),
+    }
+
+def test_rollups_follow_inserts_and_deletes(workdir):
+    migrate("store.db")
+    types = ["Helmet Violation", "Lane Violation", None]
+    timestamps = ["2024-01-01 10:15:00", "2024-01-01 11:00:00", "2024-01-02 10:00:00", None]
+    videos = ["a.mp4", None]
+    rows = [(t, ts, f"{i}.jpg", v) for i, (t, ts, v) in enumerate(itertools.product(types, timestamps, videos))]
+    conn = sqlite3.connect("store.db")
+    with conn:
+        conn.executemany("INSERT INTO violations (type, timestamp, image_path, video) VALUES (?, ?, ?, ?)",
+                         rows * 3)
+    assert rollups(conn) == rollups_from_scratch(conn)
+
+    with conn:
+        conn.execute("DELETE FROM violations WHERE id % 4 = 0 OR type IS NULL")
+    assert rollups(conn) == rollups_from_scratch(conn)
+    with conn:
+        conn.execute("DELETE FROM violations")
+    assert rollups(conn) == {"daily": [], "hourly": [], "totals": []}
+    conn.close()
+
+def test_rollups_backfill_rows_logged_before_them(workdir):
+    conn = sqlite3.connect("store.db")
+    conn.execute("CREATE TABLE violations (id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT, timestamp TEXT, "
+                 "image_path TEXT, video TEXT)")
+    conn.executemany("INSERT INTO violations (type, timestamp, image_path, video) VALUES (?, ?, ?, ?)",
+                     [row(i) for i in range(5)])
+    conn.commit()
+    migrate("store.db")
+    assert rollups(conn) == rollups_from_scratch(conn)
+    conn.close()
+
+def test_dashboard_queries_read_the_rollups(workdir):
+    with ViolationSink("store.db") as sink:
+        for i in range(3):
+            sink(*row(i, video="a.mp4"))
+        sink("Lane Violation", "2024-01-02 09:30:00", "l.jpg", "b.mp4")
+    assert violation_totals("store.db") == [("Helmet Violation", 3), ("Lane Violation", 1)]
+    assert daily_counts("2024-01-02", "store.db") == [("2024-01-02", "Lane Violation", 1)]
+    assert hourly_counts("2024-01-01 10", "store.db") == [("2024-01-01 10", "Helmet Violation", 3),
+                                                           ("2024-01-02 09", "Lane Violation", 1)]
+    assert video_counts("2024-01-01", db_path="store.db") == [("a.mp4", 3), ("b.mp4", 1)]
+
+# ---------------- Upload names ---------------- #
+
+UPLOAD = "input_videos/" + "ab" * 32 + ".mp4"
+
+def test_uploads_are_labelled_with_their_original_name(workdir):
+    migrate("store.db")
+    record_upload(UPLOAD, "junction.mp4", "store.db")
+    other = "input_videos/" + "cd" * 32 + ".mp4"  # Stored, but never recorded
+    assert video_labels([UPLOAD, other, "/data/cam1.mp4", "", None], "store.db") == {
+        UPLOAD: "junction.mp4", other: "cd" * 32 + ".mp4", "/data/cam1.mp4": "cam1.mp4", "": "", None: None}
+
+def test_reuploads_take_the_latest_name(workdir):
+    migrate("store.db")
+    record_upload(UPLOAD, "junction.mp4", "store.db")
+    record_upload(UPLOAD, "junction-monday.mp4", "store.db")
+    assert video_label(UPLOAD, "store.db") == "junction-monday.mp4"
+    assert scalar("store.db", "SELECT COUNT(*) FROM uploads") == 1
+
+def test_only_content_addressed_uploads_are_recorded(workdir):
+    migrate("store.db")
+    record_upload("clips/junction.mp4", "junction.mp4", "store.db")
+    assert scalar("store.db", "SELECT COUNT(*) FROM uploads") == 0
+
+def test_labels_fall_back_to_file_names_without_the_table(workdir):
+    assert video_label(UPLOAD, "missing.db") == "ab" * 32 + ".mp4"
+    sqlite3.connect("old.db").close()  # A store from before the uploads table
+    assert video_label(UPLOAD, "old.db") == "ab" * 32 + ".mp4"
+
+# ---------------- ViolationSink ---------------- #
+
+def test_sink_writes_in_batches(workdir):
+    sink = ViolationSink("store.db", flush_every=3, flush_interval=60)
+    try:
+        sink(*row(0))
+        sink(*row(1))
+        assert scalar("store.db", "SELECT COUNT(*) FROM violations") == 0
+        sink(*row(2))
+        assert scalar("store.db", "SELECT COUNT(*) FROM violations") == 3
+    finally:
+        sink.close()
+
+def test_sink_close_flushes_rows_and_snapshots(workdir):
+    with ViolationSink("store.db", flush_every=100, flush_interval=60) as sink:
+        sink(*row(0), snapshot=SNAPSHOT)
+        sink(*row(1))
+    assert scalar("store.db", "SELECT COUNT(*) FROM violations") == 2
+    assert scalar("store.db", "SELECT frame_num FROM snapshots WHERE path LIKE '%h_0.jpg'") == 7
+    sink.close()  # Closing again is a no-op
+
+def test_sink_flushes_periodically(workdir):
+    sink = ViolationSink("store.db", flush_every=100, flush_interval=0.05)
+    try:
+        sink(*row(0))
+        deadline = time.monotonic() + 5
+        while scalar("store.db", "SELECT COUNT(*) FROM violations") == 0:
+            assert time.monotonic() < deadline, "rows were not flushed by the background thread"
+            time.sleep(0.02)
+    finally:
+        sink.close()
+
+def test_sink_keeps_insertion_order(workdir):
+    with ViolationSink("store.db", flush_every=4, flush_interval=60) as sink:
+        for i in range(10):
+            sink(*row(i))
+    conn = sqlite3.connect("store.db")
+    paths = [path for (path,) in conn.execute("SELECT image_path FROM violations ORDER BY id")]
+    conn.close()
+    assert paths == [row(i)[2] for i in range(10)]
+
+# ---------------- Keyset paging ---------------- #
+
+@pytest.fixture(scope="module")
+def paged_db(tmp_path_factory):
+    """A store full of ties and NULLs in every sortable column."""
+    directory = tmp_path_factory.mktemp("paging")
+    db = str(directory / "violations.db")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(directory)  # The snapshot manifest migration scans snapshots/ under the cwd
+        migrate(db)
+    types = ["Helmet Violation", "Lane Violation", None]
+    timestamps = ["2024-01-01 10:00:00", "2024-01-02 10:00:00", "2024-01-02 10:00:00", None]
+    videos = ["a.mp4", "b.mp4", None]
+    rows = [(t, ts, f"{i}.jpg", v)
+            for i, (t, ts, v) in enumerate(itertools.product(types, timestamps, videos))]
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO violations (type, timestamp, image_path, video) VALUES (?, ?, ?, ?)",
+                     rows * 2)
+    conn.commit()
+    conn.close()
+    return db
+
+def all_pages(db, limit, **filters):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = query_violations(after=cursor, limit=limit, db_path=db, **filters)
+        rows += page
+        pages += 1
+        assert pages < 1000
+        if cursor is None:
+            return rows
+
+def full_order(db, sort, descending, where="", params=()):
+    direction = "DESC" if descending else "ASC"
+    order = f"id {direction}" if sort == "id" else f"{sort} {direction}, id {direction}"
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute(f"SELECT id, type, timestamp, image_path, video FROM violations {where} "
+                            f"ORDER BY {order}", params).fetchall()
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize("sort", SORT_COLUMNS)
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("limit", [1, 4, 7, 500])
+def test_pages_match_the_full_ordering(paged_db, sort, descending, limit):
+    rows = all_pages(paged_db, limit, sort=sort, descending=descending)
+    assert rows == full_order(paged_db, sort, descending)
+
+@pytest.mark.parametrize("sort", SORT_COLUMNS)
+@pytest.mark.parametrize("descending", [True, False])
+def test_pages_match_the_full_ordering_when_filtered(paged_db, sort, descending):
+    rows = all_pages(paged_db, 3, sort=sort, descending=descending, types=["Lane Violation"], video="b.mp4")
+    expected = full_order(paged_db, sort, descending, "WHERE type = ? AND video = ?", ("Lane Violation", "b.mp4"))
+    assert rows == expected and rows
+
+def test_next_cursor_is_none_on_the_last_page(paged_db):
+    total = len(full_order(paged_db, "id", True))
+    rows, cursor = query_violations(limit=total, db_path=paged_db)
+    assert len(rows) == total and cursor is None
+    rows, cursor = query_violations(limit=total - 1, db_path=paged_db)
+    assert cursor == (rows[-1][2], rows[-1][0])
+
+def test_unknown_sort_column_is_rejected(paged_db):
+    with pytest.raises(ValueError):
+        query_violations(sort="image_path; DROP TABLE violations", db_path=paged_db)
@@ -0,0 +1,29 @@
+import socket
+
+import pytest
+
+from scripts import jobs, worker
+from scripts.jobs import create_job, get_job
+from scripts.violation_db import DB_PATH, migrate
+
+def test_a_second_worker_leaves_the_running_jobs_alone(workdir, monkeypatch):
+    migrate(DB_PATH)
+    job_id = create_job("clip.mp4")
+    conn = jobs._connect()
+    with conn:
+        conn.execute("UPDATE jobs SET status = 'running', frames_done = 120 WHERE id = ?", (job_id,))
+    conn.close()
+
+    started = []
+    monkeypatch.setattr(worker, "start_runners", lambda *args, **kwargs: started.append(True))
+    monkeypatch.setenv("DETECTION_WORKER_AUTHKEY", "test-key")
+    with socket.socket() as live_worker:  # Stands in for the worker that owns the port
+        live_worker.bind(("127.0.0.1", 0))
+        live_worker.listen()
+        monkeypatch.setattr(worker, "WORKER_ADDRESS", live_worker.getsockname())
+        with pytest.raises(Exception, match="another detection worker"):
+            worker.serve()
+
+    assert started == []
+    job = get_job(job_id)
+    assert (job["status"], job["frames_done"]) == ("running", 120)
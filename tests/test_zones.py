@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+import pytest
+
+from scripts.zones import camera_zones, inference_region, load_cameras
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / "cameras.json"
+    path.write_text(json.dumps({"cameras": {
+        "gate": {"size": [1280, 720], "zones": {"lane": [[100, 200], [600, 200], [600, 700], [100, 700]]}},
+        "unscaled": {"zones": {"helmet": [[10, 20], [30, 20], [30, 40]]}},
+    }}))
+    return str(path)
+
+def test_missing_config_means_no_cameras(tmp_path):
+    assert load_cameras(str(tmp_path / "missing.json")) == {}
+
+def test_zones_are_scaled_to_the_video_size(config):
+    zones = camera_zones("gate", (640, 360), config)
+    assert zones["lane"].dtype == np.float32
+    np.testing.assert_allclose(zones["lane"], [[50, 100], [300, 100], [300, 350], [50, 350]])
+    np.testing.assert_allclose(camera_zones("gate", (1280, 720), config)["lane"][0], [100, 200])
+
+def test_zones_without_a_size_are_used_as_is(config):
+    np.testing.assert_allclose(camera_zones("unscaled", (640, 360), config)["helmet"],
+                               [[10, 20], [30, 20], [30, 40]])
+
+def test_unknown_camera_is_an_error(config):
+    with pytest.raises(Exception, match="Unknown camera"):
+        camera_zones("nowhere", (640, 360), config)
+
+def square(x1, y1, x2, y2):
+    return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+
+def test_inference_region_covers_every_zone_plus_margin():
+    zones = [square(100, 100, 200, 150), square(300, 50, 350, 120)]
+    assert inference_region(zones, (640, 360), margin=10) == (90, 40, 360, 160)
+
+def test_inference_region_is_clipped_to_the_frame():
+    assert inference_region([square(5, 300, 100, 355.5)], (640, 360), margin=10) == (0, 290, 110, 360)
+
+def test_full_frame_when_nothing_can_be_cropped():
+    assert inference_region([], (640, 360)) is None
+    # A rule without a zone needs the whole frame
+    assert inference_region([square(100, 100, 200, 200), None], (640, 360)) is None
+    assert inference_region([square(0, 0, 640, 360)], (640, 360), margin=0) is None
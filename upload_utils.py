@@ -0,0 +1,60 @@
+import os
+import hashlib
+import tempfile
+
+# Constants
+UPLOAD_DIR = "input_videos"
+CHUNK_SIZE = 1024 * 1024  # 1 MiB per read; an upload is never held in memory twice
+
+# -------------------- Content-addressed storage --------------------
+
+def content_path(digest, suffix=".mp4", directory=UPLOAD_DIR):
+    return os.path.join(directory, f"{digest}{suffix}")
+
+def hash_stream(stream, chunk_size=CHUNK_SIZE):
+    """SHA-256 hex digest of a binary stream, read in chunks from the start."""
+    stream.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_hashed(stream, directory, chunk_size):
+    """Copy `stream` to a temp file in `directory`, hashing as the data arrives."""
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                digest.update(chunk)
+                f.write(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return digest.hexdigest(), tmp_path
+
+def store_upload(stream, suffix=".mp4", directory=UPLOAD_DIR, chunk_size=CHUNK_SIZE):
+    """Store an uploaded file under its SHA-256 and return (path, is_new).
+
+    Seekable streams (Streamlit uploads are) are hashed first, so a video we
+    already have is never written again. Other streams are written to a temp
+    file while hashing and the copy is discarded if it turns out to be a
+    duplicate. New files are renamed into place, so a reader never sees a
+    partial video.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    if hasattr(stream, "seek"):
+        digest = hash_stream(stream, chunk_size)
+        path = content_path(digest, suffix, directory)
+        if os.path.exists(path):
+            return path, False
+        stream.seek(0)
+
+    digest, tmp_path = _write_hashed(stream, directory, chunk_size)
+    path = content_path(digest, suffix, directory)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+        return path, False
+    os.replace(tmp_path, path)
+    return path, True